@@ -0,0 +1,239 @@
+import os
+import time
+import asyncio
+import threading
+import logging
+import httpx
+from anthropic import Anthropic, AsyncAnthropic
+from openai import OpenAI, AsyncOpenAI
+from cohere import ClientV2, AsyncClientV2
+import google.generativeai as genai
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Connection pool shared by all clients of one provider
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100"))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20"))
+LLM_POOL_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+# Generations stream for a long time, so the read timeout is generous
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "600"))
+# Open a connection per provider at startup so the first request skips the handshake
+LLM_WARM_CONNECTIONS = os.getenv("LLM_WARM_CONNECTIONS", "true").lower() == "true"
+
+PROVIDER_BASE_URLS = {
+    "anthropic": "https://api.anthropic.com",
+    "openai": "https://api.openai.com/v1",
+    "cohere": "https://api.cohere.com"
+}
+
+
+class ConnectionStats:
+    """Per-provider request and connection counters fed by httpcore trace events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._providers = {}
+
+    def _counters(self, provider):
+        return self._providers.setdefault(provider, {
+            "requests": 0,
+            "new_connections": 0,
+            "tls_handshakes": 0,
+            "connect_seconds": 0.0,
+            "tls_seconds": 0.0
+        })
+
+    def record_request(self, provider):
+        with self._lock:
+            self._counters(provider)["requests"] += 1
+
+    def record_connection(self, provider, seconds):
+        with self._lock:
+            counters = self._counters(provider)
+            counters["new_connections"] += 1
+            counters["connect_seconds"] += seconds
+
+    def record_tls_handshake(self, provider, seconds):
+        with self._lock:
+            counters = self._counters(provider)
+            counters["tls_handshakes"] += 1
+            counters["tls_seconds"] += seconds
+
+    def stats(self):
+        with self._lock:
+            stats = {}
+            for provider, counters in self._providers.items():
+                requests = counters["requests"]
+                stats[provider] = dict(
+                    counters,
+                    reused_connections=max(0, requests - counters["new_connections"]),
+                    reuse_ratio=1 - counters["new_connections"] / requests if requests else 0.0
+                )
+            return stats
+
+
+connection_stats = ConnectionStats()
+
+
+def _tracer(provider):
+    """httpcore trace callbacks counting new TCP connections and TLS handshakes"""
+    started = {}
+
+    def on_event(event_name, info):
+        if event_name.endswith(".started"):
+            started[event_name[:-len(".started")]] = time.perf_counter()
+        elif event_name == "connection.connect_tcp.complete":
+            connection_stats.record_connection(provider, time.perf_counter() - started.get("connection.connect_tcp", time.perf_counter()))
+        elif event_name == "connection.start_tls.complete":
+            connection_stats.record_tls_handshake(provider, time.perf_counter() - started.get("connection.start_tls", time.perf_counter()))
+
+    async def trace(event_name, info):
+        on_event(event_name, info)
+
+    return on_event, trace
+
+
+class MeteredTransport(httpx.HTTPTransport):
+    def __init__(self, provider, **kwargs):
+        super().__init__(**kwargs)
+        self.provider = provider
+
+    def handle_request(self, request):
+        connection_stats.record_request(self.provider)
+        request.extensions["trace"] = _tracer(self.provider)[0]
+        return super().handle_request(request)
+
+
+class AsyncMeteredTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, provider, **kwargs):
+        super().__init__(**kwargs)
+        self.provider = provider
+
+    async def handle_async_request(self, request):
+        connection_stats.record_request(self.provider)
+        request.extensions["trace"] = _tracer(self.provider)[1]
+        return await super().handle_async_request(request)
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_POOL_KEEPALIVE_EXPIRY
+    )
+
+
+def _timeout():
+    return httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+
+
+class ClientRegistry:
+    """Process-wide, long-lived provider SDK clients.
+
+    Every provider gets one sync and one async httpx client whose connection
+    pools are shared by all SDK clients of that provider, so keep-alive
+    connections are reused across requests instead of paying a new TCP and
+    TLS handshake per call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._http_clients = {}
+        self._async_http_clients = {}
+        self._clients = {}
+        self._gemini_api_key = None
+
+    def http_client(self, provider):
+        with self._lock:
+            if provider not in self._http_clients:
+                self._http_clients[provider] = httpx.Client(
+                    transport=MeteredTransport(provider, limits=_limits()),
+                    timeout=_timeout()
+                )
+            return self._http_clients[provider]
+
+    def async_http_client(self, provider):
+        with self._lock:
+            if provider not in self._async_http_clients:
+                self._async_http_clients[provider] = httpx.AsyncClient(
+                    transport=AsyncMeteredTransport(provider, limits=_limits()),
+                    timeout=_timeout()
+                )
+            return self._async_http_clients[provider]
+
+    def _client(self, key, factory):
+        client = self._clients.get(key)
+        if client is None:
+            client = factory()
+            with self._lock:
+                client = self._clients.setdefault(key, client)
+        return client
+
+    def anthropic(self, api_key):
+        return self._client(("anthropic", api_key), lambda: Anthropic(
+            api_key=api_key, http_client=self.http_client("anthropic")
+        ))
+
+    def async_anthropic(self, api_key):
+        return self._client(("async_anthropic", api_key), lambda: AsyncAnthropic(
+            api_key=api_key, http_client=self.async_http_client("anthropic")
+        ))
+
+    def openai(self, api_key):
+        return self._client(("openai", api_key), lambda: OpenAI(
+            api_key=api_key, http_client=self.http_client("openai")
+        ))
+
+    def async_openai(self, api_key):
+        return self._client(("async_openai", api_key), lambda: AsyncOpenAI(
+            api_key=api_key, http_client=self.async_http_client("openai")
+        ))
+
+    def cohere(self, api_key):
+        return self._client(("cohere", api_key), lambda: ClientV2(
+            api_key=api_key, httpx_client=self.http_client("cohere")
+        ))
+
+    def async_cohere(self, api_key):
+        return self._client(("async_cohere", api_key), lambda: AsyncClientV2(
+            api_key=api_key, httpx_client=self.async_http_client("cohere")
+        ))
+
+    def gemini(self, api_key):
+        """The Gemini SDK keeps its own global gRPC channel; configure it only when the key changes"""
+        with self._lock:
+            if self._gemini_api_key != api_key:
+                genai.configure(api_key=api_key)
+                self._gemini_api_key = api_key
+        return genai
+
+    async def warm(self, providers=tuple(PROVIDER_BASE_URLS)):
+        """Open one pooled connection per provider; failures only cost the warm-up"""
+        if not LLM_WARM_CONNECTIONS:
+            return
+
+        async def warm_provider(provider):
+            try:
+                await self.async_http_client(provider).get(PROVIDER_BASE_URLS[provider], timeout=LLM_CONNECT_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Could not warm {provider} connection: {str(e)}")
+
+        await asyncio.gather(*(warm_provider(provider) for provider in providers))
+        logger.info(f"Warmed LLM provider connections: {', '.join(providers)}")
+
+    async def aclose(self):
+        with self._lock:
+            async_clients = list(self._async_http_clients.values())
+            sync_clients = list(self._http_clients.values())
+            self._async_http_clients.clear()
+            self._http_clients.clear()
+            self._clients.clear()
+        for client in async_clients:
+            await client.aclose()
+        for client in sync_clients:
+            client.close()
+
+
+client_registry = ClientRegistry()
@@ -0,0 +1,132 @@
+import os
+import asyncio
+import logging
+from LLM.clients import client_registry
+from core.streaming import StreamEvent
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Attempts per generation when the provider is overloaded or rate limited
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", "3"))
+# Initial backoff in seconds, doubled after every failed attempt
+PROVIDER_BACKOFF_BASE = float(os.getenv("PROVIDER_BACKOFF_BASE", "2"))
+
+RETRYABLE_MESSAGES = ("overloaded", "rate limit", "rate_limit", "timed out", "timeout")
+
+
+def is_retryable(error):
+    """Overload, rate limit, server and timeout errors are worth retrying"""
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int):
+        return status_code == 429 or status_code >= 500
+    return any(message in str(error).lower() for message in RETRYABLE_MESSAGES)
+
+
+async def stream_with_backoff(open_stream, max_retries=PROVIDER_MAX_RETRIES, backoff_base=PROVIDER_BACKOFF_BASE):
+    """Yield the events of open_stream(), retrying retryable errors with async exponential backoff.
+
+    Retries only happen before the first event, so a client never receives
+    the same text twice. An info event announces each retry.
+    """
+    for attempt in range(max_retries):
+        started = False
+        try:
+            async for event in open_stream():
+                started = True
+                yield event
+            return
+        except Exception as e:
+            if started or attempt == max_retries - 1 or not is_retryable(e):
+                raise
+            wait_time = backoff_base * (2 ** attempt)
+            logger.warning(f"Provider error (attempt {attempt + 1}/{max_retries}), retrying in {wait_time}s: {str(e)}")
+            yield StreamEvent.info(f"API overloaded. Retrying in {wait_time} seconds...")
+            await asyncio.sleep(wait_time)
+
+
+async def anthropic_stream(api_key, model, messages, system, max_tokens, temperature, block_events=False):
+    """Stream an Anthropic message; block_events also reports content block starts, stops and thinking"""
+    client = client_registry.async_anthropic(api_key)
+    async with client.messages.stream(
+        model=model,
+        messages=messages,
+        system=system,
+        max_tokens=max_tokens,
+        temperature=temperature
+    ) as stream:
+        if not block_events:
+            async for text in stream.text_stream:
+                yield StreamEvent.delta(text)
+            return
+
+        async for event in stream:
+            if event.type == "content_block_start":
+                yield StreamEvent("block_start", block_type=event.content_block.type)
+            elif event.type == "content_block_delta":
+                if event.delta.type == "thinking_delta":
+                    yield StreamEvent("thinking", text=event.delta.thinking)
+                elif event.delta.type == "text_delta":
+                    yield StreamEvent.delta(event.delta.text)
+            elif event.type == "content_block_stop":
+                yield StreamEvent("block_stop")
+
+
+async def openai_stream(api_key, model, messages, max_tokens, temperature):
+    """Stream an OpenAI chat completion"""
+    client = client_registry.async_openai(api_key)
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        stream=True,
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+            yield StreamEvent.delta(chunk.choices[0].delta.content)
+        elif chunk.choices and chunk.choices[0].finish_reason not in (None, "stop"):
+            yield StreamEvent.info(f"Stream ended: {chunk.choices[0].finish_reason}")
+
+
+# Gemini finish reasons that end a stream without (more) text
+GEMINI_BLOCKED_REASONS = {
+    "SAFETY": "Content was blocked for safety reasons.",
+    "RECITATION": "Content was blocked for recitation reasons.",
+    "OTHER": "Content generation was stopped for other reasons."
+}
+
+
+async def gemini_stream(api_key, model, prompt, max_tokens, temperature):
+    """Stream a Gemini generation through the SDK's async transport"""
+    genai = client_registry.gemini(api_key)
+    response = await genai.GenerativeModel(model).generate_content_async(
+        prompt,
+        generation_config={
+            "temperature": temperature,
+            "max_output_tokens": max_tokens
+        },
+        stream=True
+    )
+    async for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Raised when the chunk carries no text parts, e.g. blocked content
+            text = None
+        if text:
+            yield StreamEvent.delta(text)
+            continue
+        finish_reason = chunk.candidates[0].finish_reason if chunk.candidates else None
+        reason = getattr(finish_reason, "name", finish_reason)
+        if reason in GEMINI_BLOCKED_REASONS:
+            yield StreamEvent.error(GEMINI_BLOCKED_REASONS[reason])
+            return
+
+
+async def cohere_stream(api_key, model, messages, documents):
+    """Stream a Cohere chat grounded on the given documents"""
+    client = client_registry.async_cohere(api_key)
+    async for event in client.chat_stream(model=model, messages=messages, documents=documents):
+        if event.type == "content-delta":
+            yield StreamEvent.delta(event.delta.message.content.text)
@@ -1,6 +1,4 @@
-from openai import OpenAI
-from anthropic import Anthropic
-import google.generativeai as genai
+from LLM.clients import client_registry
 from constants.LLM_models import (
     MODELS,
     ModelName,
@@ -43,14 +41,12 @@ class LLM_router:
         model_params = self.model_config["override_params"].copy()
         model_params["temperature"] = self.temperature
 
+        # Clients are shared process-wide so their connection pools are reused
         if provider == Provider.OPENAI:
-            client = OpenAI(api_key=api_key)
-            return client
+            return client_registry.openai(api_key)
         elif provider == Provider.ANTHROPIC:
-            client = Anthropic(api_key=api_key)
-            return client
+            return client_registry.anthropic(api_key)
         elif provider == Provider.GOOGLE:
-            genai.configure(api_key=api_key)
-            return genai
+            return client_registry.gemini(api_key)
         else:
             raise ValueError(f"Unsupported provider: {provider}")
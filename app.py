@@ -6,8 +6,11 @@ from fastapi.middleware.cors import CORSMiddleware
 import logging
 from routes.demo import router as demoRouter
 from routes.ask_chat import router as askChatRouter
-from routes.upload import router as uploadRouter
+from routes.upload import router as uploadRouter, ingest_worker
 from routes.chatbot import router as chatbotRouter
+from routes.metrics import router as metricsRouter
+from LLM.clients import client_registry
+from database.index_audit import audit_indexes
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 import os
@@ -32,6 +35,9 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from collection_db.document import DocumentModel
 from collection_db.page import Page
 from collection_db.chatbot import Chatbot
+from collection_db.job import IngestJob
+from collection_db.image import ImageRef
+from collection_db.chat_turn import ChatTurn
 
 app = FastAPI()
 
@@ -57,6 +63,7 @@ v1_router.include_router(demoRouter, tags=["Demo"])
 v1_router.include_router(askChatRouter, prefix="/chat", tags=["Ask Chat"])
 v1_router.include_router(uploadRouter, prefix="/pdf", tags=["PDF Processing"])
 v1_router.include_router(chatbotRouter, prefix="/chatbot", tags=["Chatbot"])
+v1_router.include_router(metricsRouter, tags=["Monitoring"])
 app.include_router(v1_router)
 
 # Global exception handler
@@ -93,14 +100,33 @@ async def init_db():
             document_models=[
                 DocumentModel,
                 Page,
-                Chatbot
+                Chatbot,
+                IngestJob,
+                ImageRef,
+                ChatTurn
             ]
         )
         logger.info(f"Database {DATABASE_NAME} initialized successfully")
+        
+        # Log hot queries that are not served by the declared indexes
+        await audit_indexes()
+        
+        # Start background ingestion once the job collection is available
+        await ingest_worker.start()
     except Exception as e:
         logger.error(f"Failed to initialize database: {str(e)}", exc_info=True)
         raise
 
+# Open pooled LLM provider connections before the first request
+@app.on_event("startup")
+async def warm_llm_clients():
+    await client_registry.warm()
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    await ingest_worker.stop()
+    await client_registry.aclose()
+
 # OpenAPI schema configuration
 def my_schema():
     openapi_schema = get_openapi(
@@ -1,6 +1,9 @@
 from .document import DocumentModel
 from .page import Page, Image
 from .chatbot import Chatbot, HistoryItem, DocumentRef
+from .job import IngestJob, JobStage
+from .image import ImageRef
+from .chat_turn import ChatTurn
 
 __all__ = [
     'DocumentModel',
@@ -8,5 +11,9 @@ __all__ = [
     'Image',
     'Chatbot',
     'HistoryItem',
-    'DocumentRef'
+    'DocumentRef',
+    'IngestJob',
+    'JobStage',
+    'ImageRef',
+    'ChatTurn'
 ] 
\ No newline at end of file
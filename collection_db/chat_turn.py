@@ -0,0 +1,16 @@
+from datetime import datetime
+from beanie import Document
+from pydantic import Field
+from pydantic.types import datetime as pydantic_datetime
+
+class ChatTurn(Document):
+    chatbot_id: str
+    question: str
+    answer: str
+    timestamp: pydantic_datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "chat_turn"
+        indexes = [
+            [("chatbot_id", 1), ("timestamp", -1)],  # Latest turns of a chatbot
+        ]
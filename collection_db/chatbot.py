@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from beanie import Document
 from pydantic import BaseModel, Field
@@ -15,7 +15,13 @@ class DocumentRef(BaseModel):
 class Chatbot(Document):
     chatbot_id: str = Field(unique=True)
     document: DocumentRef
+    # Legacy embedded history; turns are stored in the chat_turn collection
     history: List[HistoryItem] = Field(default_factory=list)
+    # Rolling summary of the turns up to and including summary_until
+    history_summary: Optional[str] = None
+    summary_until: Optional[datetime] = None
+    # Bumped on every clear, so a summary started before it cannot be stored after it
+    history_generation: int = 0
     created_at: pydantic_datetime = Field(default_factory=datetime.utcnow)
     updated_at: pydantic_datetime = Field(default_factory=datetime.utcnow)
 
@@ -0,0 +1,23 @@
+from datetime import datetime
+from beanie import Document
+from pydantic import Field
+from pydantic.types import datetime as pydantic_datetime
+
+class ImageRef(Document):
+    document_id: str
+    image_id: str                       # Id as referenced in page markdown, e.g. img-2.jpeg
+    image_stem: str                     # image_id without extension, e.g. img-2
+    page_id: str
+    page_number: int
+    hash: str                           # Blob store key
+    size: int
+    mime: str
+    created_at: pydantic_datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "image"
+        indexes = [
+            [("document_id", 1), ("image_stem", 1), ("page_number", 1)],  # Image lookup by reference
+            [("document_id", 1), ("page_number", 1)],                     # Images of a document in order
+            [("page_id", 1)]                                              # Re-indexing a single page
+        ]
@@ -0,0 +1,33 @@
+from typing import List, Optional
+from datetime import datetime
+from beanie import Document
+from pydantic import BaseModel, Field
+from pydantic.types import datetime as pydantic_datetime
+
+class JobStage(BaseModel):
+    name: str
+    status: str = "pending"             # pending | running | done | failed
+    detail: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class IngestJob(Document):
+    job_id: str = Field(unique=True)
+    document_id: str
+    pdf_url: str
+    status: str = "queued"              # queued | running | done | failed
+    stages: List[JobStage] = Field(default_factory=list)
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: pydantic_datetime = Field(default_factory=datetime.utcnow)
+    updated_at: pydantic_datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Settings:
+        name = "ingest_job"
+        indexes = [
+            [("job_id", 1)],                    # Unique index
+            [("status", 1), ("created_at", 1)], # Queue order for claiming
+            [("document_id", 1)]                # Index for document reference
+        ]
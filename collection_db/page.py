@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from beanie import Document
 from pydantic import BaseModel, Field
@@ -6,7 +6,10 @@ from pydantic.types import datetime as pydantic_datetime
 
 class Image(BaseModel):
     id: str
-    image_b64: str
+    hash: Optional[str] = None          # sha256 of the image bytes in the blob store
+    size: Optional[int] = None
+    mime: Optional[str] = None
+    image_b64: Optional[str] = None     # Legacy inline payload, set only on pages not yet migrated
 
 class Page(Document):
     document_id: str
@@ -20,8 +23,7 @@ class Page(Document):
     class Settings:
         name = "page"
         indexes = [
-            [("document_id", 1)],      # Index for document reference
-            [("page_id", 1)],          # Unique index
-            [("page_number", 1)],      # Index for page ordering
-            [("updated_at", -1)]       # Time-based index
+            [("document_id", 1), ("page_number", 1)],  # Pages of a document in order
+            [("page_id", 1)],                           # Unique index
+            [("updated_at", -1)]                        # Time-based index
         ] 
\ No newline at end of file
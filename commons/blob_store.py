@@ -0,0 +1,206 @@
+import os
+import re
+import base64
+import hashlib
+import asyncio
+import logging
+import tempfile
+import urllib.request
+from dotenv import load_dotenv
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "local" keeps blobs on disk only, "r2" also uploads them to Cloudflare R2
+BLOB_STORE_BACKEND = os.getenv("BLOB_STORE_BACKEND", "local")
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.path.join(BASE_DIR, 'data', 'blobs'))
+BLOB_R2_PREFIX = os.getenv("BLOB_R2_PREFIX", "blobs")
+
+DATA_URI_PATTERN = re.compile(r"^data:([\w/+.-]+);base64,(.*)$", re.DOTALL)
+
+MIME_EXTENSIONS = {
+    "image/jpeg": ".jpeg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/bmp": ".bmp"
+}
+EXTENSION_MIMES = {extension: mime for mime, extension in MIME_EXTENSIONS.items()}
+EXTENSION_MIMES[".jpg"] = "image/jpeg"
+
+
+def guess_mime(data, filename=None):
+    """Guess an image mime type from magic bytes, falling back to the file extension"""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if filename:
+        extension = os.path.splitext(filename)[1].lower()
+        if extension in EXTENSION_MIMES:
+            return EXTENSION_MIMES[extension]
+    return "application/octet-stream"
+
+
+def decode_image_payload(value, filename=None):
+    """Decode a base64 image, with or without a data: URI prefix, into (bytes, mime)"""
+    match = DATA_URI_PATTERN.match(value)
+    if match:
+        return base64.b64decode(match.group(2)), match.group(1)
+    data = base64.b64decode(value)
+    return data, guess_mime(data, filename)
+
+
+def to_data_uri(data, mime):
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+class BlobRef:
+    def __init__(self, hash, size, mime):
+        self.hash = hash
+        self.size = size
+        self.mime = mime
+
+
+class LocalBlobStore:
+    """Content-addressed blob store on the local filesystem.
+
+    Blobs are named by the sha256 of their content, so identical images are
+    stored once no matter how many pages reference them.
+    """
+
+    def __init__(self, root=BLOB_STORE_DIR):
+        self.root = root
+
+    def path(self, hash):
+        return os.path.join(self.root, hash[:2], hash[2:4], hash)
+
+    def put(self, data, mime):
+        hash = hashlib.sha256(data).hexdigest()
+        path = self.path(hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return BlobRef(hash=hash, size=len(data), mime=mime)
+
+    def get(self, hash, mime=None):
+        try:
+            with open(self.path(hash), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def url(self, hash, mime=None):
+        """Public URL of a blob, or None when blobs are only served through the API"""
+        return None
+
+
+class R2BlobStore(LocalBlobStore):
+    """Local store mirrored to Cloudflare R2 through commons.cloudflare_upload.
+
+    The local copy acts as a cache; blobs missing locally are fetched from the
+    public R2 URL. A marker file next to the local copy records that the blob
+    is in R2, so failed uploads are retried on the next put() and url() only
+    hands out public URLs that resolve.
+    """
+
+    def __init__(self, root=BLOB_STORE_DIR, prefix=BLOB_R2_PREFIX):
+        super().__init__(root)
+        # Imported lazily: the module validates R2 credentials on import
+        from commons.cloudflare_upload import simple_upload_to_cloudflare, PUBLIC_R2_AUDIO
+        self._upload = simple_upload_to_cloudflare
+        self.public_url = PUBLIC_R2_AUDIO
+        self.prefix = prefix
+        self._uploaded = set()
+
+    def _key(self, hash, mime):
+        return f"{self.prefix}/{hash}{MIME_EXTENSIONS.get(mime, '')}"
+
+    def _public_url(self, hash, mime):
+        return f"{self.public_url}/{self._key(hash, mime)}"
+
+    def _marker_path(self, hash):
+        return self.path(hash) + ".r2"
+
+    def in_r2(self, hash):
+        if hash in self._uploaded:
+            return True
+        if os.path.exists(self._marker_path(hash)):
+            self._uploaded.add(hash)
+            return True
+        return False
+
+    def _mark_uploaded(self, hash):
+        open(self._marker_path(hash), 'a').close()
+        self._uploaded.add(hash)
+
+    def put(self, data, mime):
+        ref = super().put(data, mime)
+        if not self.in_r2(ref.hash):
+            if self._upload(self.path(ref.hash), self._key(ref.hash, mime)):
+                self._mark_uploaded(ref.hash)
+            else:
+                logger.error(f"Failed to upload blob {ref.hash} to R2, serving it from local storage until a later put succeeds")
+        return ref
+
+    def get(self, hash, mime=None):
+        data = super().get(hash)
+        if data is not None or not mime:
+            return data
+        try:
+            with urllib.request.urlopen(self._public_url(hash, mime), timeout=10) as response:
+                data = response.read()
+        except Exception as e:
+            logger.error(f"Failed to fetch blob {hash} from R2: {str(e)}")
+            return None
+        super().put(data, mime)
+        self._mark_uploaded(hash)
+        return data
+
+    def url(self, hash, mime=None):
+        """Public R2 URL, or None while the blob is only stored locally"""
+        return self._public_url(hash, mime) if self.in_r2(hash) else None
+
+
+_blob_store = None
+
+
+def get_blob_store():
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = R2BlobStore() if BLOB_STORE_BACKEND == "r2" else LocalBlobStore()
+    return _blob_store
+
+
+def read_image(image):
+    """Return (bytes, mime) for a page Image, whether stored in the blob store or inline"""
+    if image.hash:
+        data = get_blob_store().get(image.hash, image.mime)
+        return (data, image.mime) if data is not None else (None, None)
+    if image.image_b64:
+        return decode_image_payload(image.image_b64, image.id)
+    return None, None
+
+
+async def aread_image(image):
+    """read_image off the event loop"""
+    return await asyncio.to_thread(read_image, image)
+
+
+async def aimage_data_uri(image):
+    """Data URI of a page Image, the format clients historically received as image_b64"""
+    if not image.hash:
+        return image.image_b64
+    data, mime = await aread_image(image)
+    return to_data_uri(data, mime) if data is not None else None
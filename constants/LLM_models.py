@@ -11,6 +11,10 @@ GEMINI_API_KEY = os.environ["GEMINI_API_KEY"]
 PORTKEY_API_KEY = os.environ["PORTKEY_API_KEY"]
 PORTKEY_GATEWAY_URL = os.environ["PORTKEY_GATEWAY_URL"]
 
+# Tokens of chat history replayed into the prompt when a model sets no budget
+# (also used by the default Cohere chat)
+DEFAULT_HISTORY_TOKEN_BUDGET = int(os.getenv("DEFAULT_HISTORY_TOKEN_BUDGET", "4000"))
+
 
 class Provider(Enum):
     OPENAI = "openai"
@@ -44,26 +48,31 @@ MODELS = {
     ModelName.GPT_3_5: {
         "provider": Provider.OPENAI,
         "api_key": OPENAI_KEY,
+        "history_token_budget": 3000,
         "override_params": {"model": ModelName.GPT_3_5.value, "max_tokens": 4096},
     },
     ModelName.GPT_4O_MINI: {
         "provider": Provider.OPENAI,
         "api_key": OPENAI_KEY,
+        "history_token_budget": 6000,
         "override_params": {"model": ModelName.GPT_4O_MINI.value, "max_tokens": 4096},
     },
     ModelName.GPT_4O: {
         "provider": Provider.OPENAI,
         "api_key": OPENAI_KEY,
+        "history_token_budget": 6000,
         "override_params": {"model": ModelName.GPT_4O.value, "max_tokens": 4096},
     },
     ModelName.GPT_4: {
         "provider": Provider.OPENAI,
         "api_key": OPENAI_KEY,
+        "history_token_budget": 2000,
         "override_params": {"model": ModelName.GPT_4.value, "max_tokens": 4096},
     },
     ModelName.CLAUDE_3_7_SONNET: {
         "provider": Provider.ANTHROPIC,
         "api_key": ANTHROPIC_API_KEY,
+        "history_token_budget": 8000,
         "override_params": {
             "model": ModelName.CLAUDE_3_7_SONNET.value,
             "max_tokens": 4096,
@@ -72,6 +81,7 @@ MODELS = {
     ModelName.CLAUDE_3_5_HAIKU: {
         "provider": Provider.ANTHROPIC,
         "api_key": ANTHROPIC_API_KEY,
+        "history_token_budget": 6000,
         "override_params": {
             "model": ModelName.CLAUDE_3_5_HAIKU.value,
             "max_tokens": 4096,
@@ -80,6 +90,7 @@ MODELS = {
     ModelName.CLAUDE_3_5_SONNET: {
         "provider": Provider.ANTHROPIC,
         "api_key": ANTHROPIC_API_KEY,
+        "history_token_budget": 8000,
         "override_params": {
             "model": ModelName.CLAUDE_3_5_SONNET.value,
             "max_tokens": 4096,
@@ -88,6 +99,7 @@ MODELS = {
     ModelName.CLAUDE_3_HAIKU: {
         "provider": Provider.ANTHROPIC,
         "api_key": ANTHROPIC_API_KEY,
+        "history_token_budget": 4000,
         "override_params": {
             "model": ModelName.CLAUDE_3_HAIKU.value,
             "max_tokens": 4096,
@@ -96,6 +108,7 @@ MODELS = {
     ModelName.CLAUDE_3_SONNET: {
         "provider": Provider.ANTHROPIC,
         "api_key": ANTHROPIC_API_KEY,
+        "history_token_budget": 6000,
         "override_params": {
             "model": ModelName.CLAUDE_3_SONNET.value,
             "max_tokens": 4096,
@@ -104,6 +117,7 @@ MODELS = {
     ModelName.CLAUDE_3_OPUS: {
         "provider": Provider.ANTHROPIC,
         "api_key": ANTHROPIC_API_KEY,
+        "history_token_budget": 8000,
         "override_params": {
             "model": ModelName.CLAUDE_3_OPUS.value,
             "max_tokens": 4096,
@@ -112,6 +126,7 @@ MODELS = {
     ModelName.GEMINI_2_5_PRO_EXP_03_25: {
         "provider": Provider.GOOGLE,
         "api_key": GEMINI_API_KEY,
+        "history_token_budget": 8000,
         "override_params": {
             "model": ModelName.GEMINI_2_5_PRO_EXP_03_25.value,
             "max_tokens": 4096,
@@ -120,6 +135,7 @@ MODELS = {
     ModelName.GEMINI_2_0_PRO_EXP_02_05: {
         "provider": Provider.GOOGLE,
         "api_key": GEMINI_API_KEY,
+        "history_token_budget": 8000,
         "override_params": {
             "model": ModelName.GEMINI_2_0_PRO_EXP_02_05.value,
             "max_tokens": 4096,
@@ -128,6 +144,7 @@ MODELS = {
     ModelName.GEMINI_2_0_FLASH_LITE_001: {
         "provider": Provider.GOOGLE,
         "api_key": GEMINI_API_KEY,
+        "history_token_budget": 6000,
         "override_params": {
             "model": ModelName.GEMINI_2_0_FLASH_LITE_001.value,
             "max_tokens": 4096,
@@ -136,6 +153,7 @@ MODELS = {
     ModelName.GEMINI_2_0_FLASH_001: {
         "provider": Provider.GOOGLE,
         "api_key": GEMINI_API_KEY,
+        "history_token_budget": 6000,
         "override_params": {
             "model": ModelName.GEMINI_2_0_FLASH_001.value,
             "max_tokens": 4096,
@@ -144,6 +162,7 @@ MODELS = {
     ModelName.GEMINI_FLASH_1_5: {
         "provider": Provider.GOOGLE,
         "api_key": GEMINI_API_KEY,
+        "history_token_budget": 6000,
         "override_params": {
             "model": ModelName.GEMINI_FLASH_1_5.value,
             "max_tokens": 4096,
@@ -152,6 +171,7 @@ MODELS = {
     ModelName.GEMINI_PRO_1_5: {
         "provider": Provider.GOOGLE,
         "api_key": GEMINI_API_KEY,
+        "history_token_budget": 8000,
         "override_params": {
             "model": ModelName.GEMINI_PRO_1_5.value,
             "max_tokens": 4096,
@@ -160,11 +180,13 @@ MODELS = {
     ModelName.GPT_O1: {
         "provider": Provider.OPENAI,
         "api_key": OPENAI_KEY,
+        "history_token_budget": 6000,
         "override_params": {"model": ModelName.GPT_O1.value},
     },
     ModelName.GPT_O3_MINI_2025_01_31: {
         "provider": Provider.OPENAI,
         "api_key": OPENAI_KEY,
+        "history_token_budget": 6000,
         "override_params": {"model": ModelName.GPT_O3_MINI_2025_01_31.value},
     }
     
@@ -0,0 +1,153 @@
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+import numpy as np
+
+from core.embedding_cache import normalize_query
+from core.streaming import StreamEvent
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+# Cached answers kept per (document, model)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+# Minimum cosine similarity between query embeddings for a near-duplicate hit
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+# Characters per text event when replaying a cached answer
+ANSWER_CACHE_REPLAY_CHARS = int(os.getenv("ANSWER_CACHE_REPLAY_CHARS", "64"))
+
+
+class AnswerCacheEntry:
+    def __init__(self, query, embedding, answer):
+        self.query = query
+        self.embedding = embedding
+        self.answer = answer
+        self.created_at = time.time()
+
+
+class CachedQuery:
+    """Result of a lookup; pass it back to put() to store the generated answer on a miss"""
+
+    def __init__(self, document_id, model, query, embedding=None, answer=None, match=None):
+        self.document_id = document_id
+        self.model = model
+        self.query = query
+        self.embedding = embedding
+        self.answer = answer
+        self.match = match
+
+
+class SemanticAnswerCache:
+    """Process-wide cache of generated answers per document and model.
+
+    Queries are matched on their normalized text first, then on the cosine
+    similarity of their embeddings, so rephrasings of the same question
+    reuse one answer. Entries expire after ttl seconds and are dropped when
+    their document is re-ingested.
+    """
+
+    def __init__(self, max_entries, ttl, threshold):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._scopes = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+
+    def _live_entries(self, scope):
+        entries = self._scopes.get(scope)
+        if not entries:
+            return None
+        expired = [query for query, entry in entries.items() if time.time() - entry.created_at > self.ttl]
+        for query in expired:
+            del entries[query]
+        return entries
+
+    async def lookup(self, document_id, model, query, embed=None):
+        """Find a cached answer for query; embed is an async function returning (1, dim) embeddings"""
+        normalized = normalize_query(query)
+        scope = (document_id, model)
+        with self._lock:
+            entries = self._live_entries(scope)
+            entry = entries.get(normalized) if entries else None
+            if entry is not None:
+                entries.move_to_end(normalized)
+                self.exact_hits += 1
+                return CachedQuery(document_id, model, normalized, entry.embedding, entry.answer, "exact")
+
+        embedding = None
+        if embed is not None:
+            try:
+                embedding = np.asarray(await embed([query]), dtype=np.float32)[0]
+                embedding = embedding / (np.linalg.norm(embedding) or 1.0)
+            except Exception as e:
+                logger.warning(f"Answer cache could not embed query, using exact matching only: {str(e)}")
+
+        with self._lock:
+            entries = self._live_entries(scope)
+            if embedding is not None and entries:
+                candidates = list(entries.values())
+                scores = np.stack([candidate.embedding for candidate in candidates]) @ embedding
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self.semantic_hits += 1
+                    logger.info(f"Answer cache hit for {query!r} ~ {candidates[best].query!r} ({scores[best]:.3f})")
+                    return CachedQuery(document_id, model, normalized, embedding, candidates[best].answer, "semantic")
+            self.misses += 1
+        return CachedQuery(document_id, model, normalized, embedding)
+
+    def put(self, cached_query, answer):
+        """Store the answer generated after a miss"""
+        if cached_query.embedding is None or not answer:
+            return
+        scope = (cached_query.document_id, cached_query.model)
+        with self._lock:
+            entries = self._scopes.setdefault(scope, OrderedDict())
+            entries[cached_query.query] = AnswerCacheEntry(cached_query.query, cached_query.embedding, answer)
+            entries.move_to_end(cached_query.query)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self.stores += 1
+
+    def invalidate(self, document_id):
+        """Drop every cached answer of a document, e.g. after it was re-ingested"""
+        with self._lock:
+            for scope in [scope for scope in self._scopes if scope[0] == document_id]:
+                del self._scopes[scope]
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "enabled": ANSWER_CACHE_ENABLED,
+                "entries": sum(len(entries) for entries in self._scopes.values()),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "invalidations": self.invalidations,
+                "hit_ratio": hits / lookups if lookups else 0.0
+            }
+
+
+answer_cache = SemanticAnswerCache(
+    max_entries=ANSWER_CACHE_SIZE,
+    ttl=ANSWER_CACHE_TTL,
+    threshold=ANSWER_CACHE_THRESHOLD
+)
+
+
+async def replay_answer(answer, chunk_chars=ANSWER_CACHE_REPLAY_CHARS):
+    """Stream a cached answer as text events, without any pacing"""
+    for start in range(0, len(answer), chunk_chars):
+        yield StreamEvent.delta(answer[start:start + chunk_chars])
@@ -1,16 +1,15 @@
-from cohere import Client, ClientV2
+from cohere import Client
 from cohere import ChatbotMessage, UserMessage
 import json
 import os
 from dotenv import load_dotenv
 from core.load_documents import load_documents
 from core.prompt import PROMPT_CHAT_SYSTEM
-from core.retrieve import retrieve_and_rerank, load_vector_database
-from LLM.router import LLM_router
+from core.retrieve import aretrieve, load_vector_database
+from LLM.providers import stream_with_backoff, is_retryable, anthropic_stream, openai_stream, gemini_stream, cohere_stream
+from core.streaming import StreamEvent
 from llama_index.core.llms import ChatMessage, MessageRole
 from constants.LLM_models import Provider, MODELS, ModelName
-from openai import OpenAI
-import time
 from database.document import get_document_by_id
 import asyncio
 
@@ -46,8 +45,6 @@ async def chat(message, document_id, chat_history=None, model="command-r-plus-04
     return response
 
 async def chat_stream(query, document_id, chat_history=None, model="command-r-plus-04-2024"):
-    co = ClientV2(api_key=API_KEY)
-    
     message = [{"role": "system", "content": PROMPT_CHAT_SYSTEM}]
     
     if chat_history is None:
@@ -61,7 +58,7 @@ async def chat_stream(query, document_id, chat_history=None, model="command-r-pl
     if not documents_path or not vector_path:
         raise ValueError(f"No document found for ID: {document_id}")
         
-    results = retrieve_and_rerank(query, documents_path, vector_path)
+    results = await aretrieve(query, documents_path, vector_path, document_id=document_id)
     
     documents = []
     for idx, result in enumerate(results):
@@ -75,13 +72,13 @@ async def chat_stream(query, document_id, chat_history=None, model="command-r-pl
             }
         )
     
-    stream = co.chat_stream(
-        messages=messages,
+    async for event in stream_with_backoff(lambda: cohere_stream(
+        API_KEY,
         model=model,
+        messages=messages,
         documents=documents
-    )
-    
-    return stream
+    )):
+        yield event
 
 async def chat_streamv2(query, document_id, chat_history=None, model_name="CLAUDE_3_7_SONNET", temperature=0.0):
     try:
@@ -106,7 +103,7 @@ async def chat_streamv2(query, document_id, chat_history=None, model_name="CLAUD
         try:
             documents_path, vector_path = await get_document_paths(document_id)
             if documents_path and vector_path:
-                results = retrieve_and_rerank(query, documents_path, vector_path)
+                results = await aretrieve(query, documents_path, vector_path, document_id=document_id)
                 if results:
                     documents = [{"title": f"chunk_{idx + 1}", "content": result[0]} 
                                for idx, result in enumerate(results)]
@@ -125,9 +122,7 @@ Question: {query}
 Please provide a detailed answer based on the documents above.""".strip()
 
         try:
-            # Get appropriate client based on provider
-            llm_router = LLM_router(model_name=model_name, temperature=temperature)
-            client = llm_router.get_model()
+            api_key = MODELS[model_enum]["api_key"]
 
             if provider == Provider.ANTHROPIC:
                 messages = [
@@ -136,109 +131,42 @@ Please provide a detailed answer based on the documents above.""".strip()
                 ]
                 
                 # Kiểm tra API key
-                api_key = MODELS[model_enum]["api_key"]
                 if not api_key:
                     print("Missing API key for Anthropic model")
-                    yield json.dumps({
-                        "type": "error",
-                        "error": "Missing API key for Anthropic model"
-                    })
+                    yield StreamEvent.error("Missing API key for Anthropic model")
                     return
                 
-                print(f"Using Anthropic API key: {api_key[:5]}...")
-                
                 try:
-                    from anthropic import Anthropic
-                    # Tạo client mới với API key
-                    anthropic_client = Anthropic(api_key=api_key)
-                    
                     # Special handling for CLAUDE_3_7_SONNET with thinking feature
                     if model_name == "CLAUDE_3_7_SONNET":
-                        max_retries = 3
-                        retry_delay = 2  # Initial delay in seconds
-                        
-                        for retry in range(max_retries):
-                            try:
-                                with anthropic_client.messages.stream(
-                                    model=model_enum.value,
-                                    messages=messages,
-                                    system=system_prompt,  # Add system prompt as top-level parameter
-                                    max_tokens=32000,
-                                    temperature=1.0
-                                ) as stream:
-                                    for event in stream:
-                                        if event.type == "content_block_start":
-                                            yield json.dumps({
-                                                "type": "content_block_start",
-                                                "block_type": event.content_block.type
-                                            })
-                                        elif event.type == "content_block_delta":
-                                            if event.delta.type == "thinking_delta":
-                                                yield json.dumps({
-                                                    "type": "thinking_delta",
-                                                    "text": event.delta.thinking
-                                                })
-                                            elif event.delta.type == "text_delta":
-                                                yield json.dumps({
-                                                    "type": "text_delta",
-                                                    "text": event.delta.text
-                                                })
-                                        elif event.type == "content_block_stop":
-                                            yield json.dumps({
-                                                "type": "content_block_stop"
-                                            })
-                                # If we get here, the stream completed successfully
-                                break
-                            except Exception as e:
-                                error_str = str(e)
-                                print(f"Error in Anthropic API call (attempt {retry+1}/{max_retries}): {error_str}")
-                                
-                                # Check if it's an overloaded error
-                                if "overloaded" in error_str.lower():
-                                    if retry < max_retries - 1:
-                                        # Calculate exponential backoff
-                                        wait_time = retry_delay * (2 ** retry)
-                                        print(f"API overloaded. Retrying in {wait_time} seconds...")
-                                        yield json.dumps({
-                                            "type": "info",
-                                            "text": f"API overloaded. Retrying in {wait_time} seconds..."
-                                        })
-                                        time.sleep(wait_time)
-                                    else:
-                                        # Max retries reached
-                                        yield json.dumps({
-                                            "type": "error",
-                                            "error": "Anthropic API is currently overloaded. Please try again later."
-                                        })
-                                        return
-                                else:
-                                    # For other errors, just yield the error
-                                    yield json.dumps({
-                                        "type": "error",
-                                        "error": error_str
-                                    })
-                                    return
+                        stream = stream_with_backoff(lambda: anthropic_stream(
+                            api_key,
+                            model=model_enum.value,
+                            messages=messages,
+                            system=system_prompt,  # Add system prompt as top-level parameter
+                            max_tokens=32000,
+                            temperature=1.0,
+                            block_events=True
+                        ))
                     # Simple streaming for other Claude models
                     else:
-                        with anthropic_client.messages.stream(
+                        stream = stream_with_backoff(lambda: anthropic_stream(
+                            api_key,
                             model=model_enum.value,
                             messages=messages,
                             system=system_prompt,  # Add system prompt as top-level parameter
                             max_tokens=model_config.get("max_tokens", 4096),
                             temperature=temperature
-                        ) as stream:
-                            for text in stream.text_stream:
-                                yield json.dumps({
-                                    "type": "content_block_delta",
-                                    "text": text
-                                })
+                        ))
+                    async for event in stream:
+                        yield event
                             
                 except Exception as e:
                     print(f"Error in Anthropic API call: {str(e)}")
-                    yield json.dumps({
-                        "type": "error",
-                        "error": f"Anthropic API error: {str(e)}"
-                    })
+                    if is_retryable(e):
+                        yield StreamEvent.error("Anthropic API is currently overloaded. Please try again later.")
+                    else:
+                        yield StreamEvent.error(f"Anthropic API error: {str(e)}")
                 return
 
             elif provider == Provider.GOOGLE:
@@ -248,61 +176,39 @@ Please provide a detailed answer based on the documents above.""".strip()
                     formatted_prompt += f"{msg['role'].title()}: {msg['content']}\n\n"
                 formatted_prompt += f"User: {user_prompt}\n\nAssistant: "
                 
-                model = client.GenerativeModel(model_enum.value)
-                response = model.generate_content(
-                    formatted_prompt,
-                    generation_config={
-                        "temperature": temperature,
-                        "max_output_tokens": model_config.get("max_tokens", 4096)
-                    },
-                    stream=True
-                )
-                
-                for chunk in response:
-                    if chunk.text:
-                        yield json.dumps({
-                            "type": "text_delta",
-                            "text": chunk.text
-                        })
+                try:
+                    async for event in stream_with_backoff(lambda: gemini_stream(
+                        api_key,
+                        model=model_enum.value,
+                        prompt=formatted_prompt,
+                        max_tokens=model_config.get("max_tokens", 4096),
+                        temperature=temperature
+                    )):
+                        yield event
+                except Exception as e:
+                    print(f"Error in Gemini API call: {str(e)}")
+                    yield StreamEvent.error(f"Gemini API error: {str(e)}")
 
             elif provider == Provider.OPENAI:
                 try:
-                    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-                    
                     messages = [
                         {"role": "system", "content": system_prompt},
                         *formatted_messages,
                         {"role": "user", "content": user_prompt}
                     ]
                     
-                    print("OpenAI messages:", messages)
-                    
-                    stream = client.chat.completions.create(
+                    async for event in stream_with_backoff(lambda: openai_stream(
+                        api_key,
                         model=model_enum.value,
                         messages=messages,
-                        stream=True,
-                        temperature=temperature,
-                        max_tokens=model_config.get("max_tokens", 4096)
-                    )
-                    
-                    for chunk in stream:
-                        if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
-                            yield json.dumps({
-                                "type": "text_delta",
-                                "text": chunk.choices[0].delta.content
-                            })
-                        elif chunk.choices and chunk.choices[0].finish_reason:
-                            yield json.dumps({
-                                "type": "finish",
-                                "reason": chunk.choices[0].finish_reason
-                            })
+                        max_tokens=model_config.get("max_tokens", 4096),
+                        temperature=temperature
+                    )):
+                        yield event
                             
                 except Exception as e:
                     print(f"Error creating OpenAI stream: {str(e)}")
-                    yield json.dumps({
-                        "type": "error",
-                        "error": f"OpenAI API error: {str(e)}"
-                    })
+                    yield StreamEvent.error(f"OpenAI API error: {str(e)}")
 
             else:
                 raise ValueError(f"Unsupported provider: {provider}")
@@ -0,0 +1,77 @@
+import os
+import time
+import random
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+from LLM.clients import client_registry
+
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+API_KEY = os.getenv("COHERE_API_KEY")
+
+# Maximum number of embed requests in flight at once
+EMBED_MAX_IN_FLIGHT = int(os.getenv("EMBED_MAX_IN_FLIGHT", "4"))
+# Retries per batch for rate limiting and transient server errors
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+EMBED_BACKOFF_BASE = float(os.getenv("EMBED_BACKOFF_BASE", "1.0"))
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def _retry_delay(error, attempt):
+    """Seconds to wait before retrying, honouring a Retry-After header when the API sends one"""
+    headers = getattr(error, 'headers', None) or {}
+    retry_after = headers.get('retry-after') or headers.get('Retry-After')
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return EMBED_BACKOFF_BASE * (2 ** attempt) + random.uniform(0, EMBED_BACKOFF_BASE)
+
+def embed_batch(batch, input_type="search_document", max_retries=EMBED_MAX_RETRIES):
+    """Embed one batch, retrying with exponential backoff on rate limits and transient errors"""
+    for attempt in range(max_retries + 1):
+        try:
+            response = client_registry.cohere(API_KEY).embed(
+                texts=batch,
+                model="embed-multilingual-v3.0",
+                input_type=input_type,
+                embedding_types=['float']
+            )
+            return response.embeddings.float
+        except Exception as e:
+            status_code = getattr(e, 'status_code', None)
+            if status_code not in RETRYABLE_STATUS_CODES or attempt == max_retries:
+                raise
+            delay = _retry_delay(e, attempt)
+            logger.warning(f"Embed request failed with status {status_code}, retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+            time.sleep(delay)
+
+def batch_embed(texts, batch_size=96, max_in_flight=EMBED_MAX_IN_FLIGHT, input_type="search_document"):
+    """Embed texts in batches with up to max_in_flight concurrent requests, preserving input order"""
+    batches = [texts[i:i+batch_size] for i in range(0, len(texts), batch_size)]
+    if not batches:
+        return []
+    results = [None] * len(batches)
+    start = time.perf_counter()
+    done_texts = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(max_in_flight, len(batches)))) as pool:
+        futures = {pool.submit(embed_batch, batch, input_type): i for i, batch in enumerate(batches)}
+        for done_batches, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            results[i] = future.result()
+            done_texts += len(batches[i])
+            elapsed = time.perf_counter() - start
+            logger.info(
+                f"Embedded batch {done_batches}/{len(batches)} "
+                f"({done_texts}/{len(texts)} texts, {done_texts / elapsed:.1f} texts/s, {done_batches / elapsed:.2f} batches/s)"
+            )
+    
+    all_embeddings = []
+    for batch_embeddings in results:
+        all_embeddings.extend(batch_embeddings)
+    logger.info(f"Embedded {len(texts)} texts in {len(batches)} batches in {time.perf_counter() - start:.2f}s")
+    return all_embeddings
@@ -0,0 +1,146 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+import logging
+from collections import OrderedDict
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Number of query embeddings kept in memory
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "4096"))
+# Optional SQLite file for the persistent tier; unset disables it
+QUERY_EMBED_CACHE_DB = os.getenv("QUERY_EMBED_CACHE_DB")
+# Entries older than this many seconds are ignored and refreshed
+QUERY_EMBED_CACHE_TTL = int(os.getenv("QUERY_EMBED_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def normalize_query(text):
+    """Normalize query text so trivially different spellings share a cache entry"""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+class QueryEmbeddingCache:
+    """Two-tier cache of query embeddings keyed on normalized text and model name.
+
+    The memory tier is an LRU; the optional SQLite tier survives restarts and
+    is shared by every worker pointing at the same file.
+    """
+
+    def __init__(self, max_entries, db_path=None, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT, dim INTEGER, embedding BLOB, created_at REAL)"
+            )
+            self._db.commit()
+            logger.info(f"Query embedding disk cache enabled at {db_path}")
+        except sqlite3.Error as e:
+            logger.error(f"Could not open query embedding cache {db_path}: {str(e)}")
+            self._db = None
+
+    @property
+    def persistent(self):
+        """Whether lookups and stores touch the SQLite tier, i.e. may block on disk"""
+        return self._db is not None
+
+    @staticmethod
+    def make_key(query, model):
+        normalized = normalize_query(query)
+        return hashlib.sha256(f"{model}\n{normalized}".encode('utf-8')).hexdigest()
+
+    def _expired(self, created_at):
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def get(self, query, model):
+        """Return the cached embedding or None"""
+        key = self.make_key(query, model)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[1]):
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT embedding, created_at FROM query_embeddings WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"Query embedding disk cache read failed: {str(e)}")
+                    row = None
+                if row is not None and not self._expired(row[1]):
+                    embedding = np.frombuffer(row[0], dtype=np.float32)
+                    self._store(key, embedding, row[1])
+                    self.disk_hits += 1
+                    return embedding
+
+            self.misses += 1
+            return None
+
+    def put(self, query, model, embedding):
+        key = self.make_key(query, model)
+        embedding = np.asarray(embedding, dtype=np.float32)
+        created_at = time.time()
+        with self._lock:
+            self._store(key, embedding, created_at)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?, ?, ?)",
+                        (key, model, embedding.shape[0], embedding.tobytes(), created_at)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Query embedding disk cache write failed: {str(e)}")
+
+    def _store(self, key, embedding, created_at):
+        self._entries[key] = (embedding, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk_tier": self._db is not None,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / lookups if lookups else 0.0
+            }
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    max_entries=QUERY_EMBED_CACHE_SIZE,
+    db_path=QUERY_EMBED_CACHE_DB,
+    ttl=QUERY_EMBED_CACHE_TTL
+)
@@ -0,0 +1,225 @@
+import os
+import re
+import asyncio
+import logging
+from datetime import timedelta
+
+from constants.LLM_models import MODELS, ModelName, DEFAULT_HISTORY_TOKEN_BUDGET
+from database.chatbot import get_chat_history, get_chat_turns_between, has_chat_turns_before, update_history_summary
+from LLM.clients import client_registry
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Share of the history budget reserved for the rolling summary of older turns
+HISTORY_SUMMARY_SHARE = float(os.getenv("HISTORY_SUMMARY_SHARE", "0.25"))
+# Model that writes the rolling summary
+HISTORY_SUMMARY_MODEL = os.getenv("HISTORY_SUMMARY_MODEL", "GPT_4O_MINI")
+HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "512"))
+# Latest turns read per request; the token budget picks the window from these
+HISTORY_PAGE_TURNS = int(os.getenv("HISTORY_PAGE_TURNS", "50"))
+# Turns folded into the summary per summary model call
+HISTORY_SUMMARY_BATCH_TURNS = int(os.getenv("HISTORY_SUMMARY_BATCH_TURNS", "20"))
+
+CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an assistant about a product manual.
+Update the summary with the new turns below. Keep facts, settings, steps, page numbers and open questions the user may refer back to; drop small talk.
+Write in the language of the conversation, at most {max_words} words.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}
+
+Updated summary:"""
+
+# Chatbots whose summary is being recomputed by this process
+_summarizing = set()
+# Strong references to running summary tasks; the event loop only keeps weak ones
+_summary_tasks = set()
+
+
+def estimate_tokens(text):
+    """Cheap token estimate: one token per CJK character, one per four other characters"""
+    if not text:
+        return 0
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Longest prefix of text whose token estimate fits max_tokens, marked with an ellipsis when cut"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) + 1 <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low].rstrip() + "…" if low else ""
+
+
+def history_token_budget(model_name):
+    """History budget of a model by enum name or value; the default chat uses DEFAULT_HISTORY_TOKEN_BUDGET"""
+    for model_enum in ModelName:
+        if model_name in (model_enum.name, model_enum.value):
+            return MODELS[model_enum].get("history_token_budget", DEFAULT_HISTORY_TOKEN_BUDGET)
+    return DEFAULT_HISTORY_TOKEN_BUDGET
+
+
+def turn_tokens(item):
+    return estimate_tokens(item.question) + estimate_tokens(item.answer)
+
+
+def split_history(history, budget):
+    """Split turns into (older, recent) where recent is the newest run of turns fitting the budget"""
+    used = 0
+    start = len(history)
+    for item in reversed(history):
+        tokens = turn_tokens(item)
+        if used + tokens > budget:
+            break
+        used += tokens
+        start -= 1
+    return history[:start], history[start:]
+
+
+def format_turns(history):
+    messages = []
+    for item in history:
+        messages.append({"role": "user", "content": item.question})
+        messages.append({"role": "assistant", "content": item.answer})
+    return messages
+
+
+async def load_turns(chatbot):
+    """Latest turns of a chatbot, including any not yet migrated out of Chatbot.history"""
+    turns = await get_chat_history(chatbot.chatbot_id, limit=HISTORY_PAGE_TURNS)
+    if chatbot.history:
+        turns = (list(chatbot.history) + turns)[-HISTORY_PAGE_TURNS:]
+    return turns
+
+
+async def has_turns_before(chatbot, before):
+    """Whether any turn, migrated or legacy, predates the loaded page"""
+    if any(item.timestamp < before for item in chatbot.history):
+        return True
+    return await has_chat_turns_before(chatbot.chatbot_id, before)
+
+
+async def assemble_history(chatbot, model_name):
+    """Chat history messages for a prompt, bounded by the model's history token budget.
+
+    The newest turns are replayed verbatim; older turns are represented by
+    the chatbot's rolling summary. When turns fall out of the window and
+    are not summarized yet, the summary is extended in the background, so
+    requests never wait on it and each turn is summarized once.
+    """
+    history = await load_turns(chatbot)
+    budget = history_token_budget(model_name)
+    summary = chatbot.history_summary
+    summary_budget = min(estimate_tokens(summary), int(budget * HISTORY_SUMMARY_SHARE)) if summary else 0
+    # The summary is written for the largest budgets; cut it to the share reserved for it here
+    summary = truncate_to_tokens(summary, summary_budget) if summary else summary
+
+    older, recent = split_history(history, budget - summary_budget)
+    messages = format_turns(recent)
+    if older:
+        dropped_until = older[-1].timestamp
+    elif len(history) >= HISTORY_PAGE_TURNS:
+        # Turns before the loaded page are out of the window too; Mongo stores milliseconds
+        dropped_until = history[0].timestamp - timedelta(milliseconds=1)
+    else:
+        return messages
+
+    # Every turn up to the newest one left out of the window belongs in the summary,
+    # including turns older than the loaded page; a full page may have nothing before it
+    if chatbot.summary_until is None or dropped_until > chatbot.summary_until:
+        if older or await has_turns_before(chatbot, history[0].timestamp):
+            schedule_summary(chatbot, dropped_until)
+
+    if summary:
+        messages = [
+            {"role": "user", "content": f"Summary of our earlier conversation:\n{summary}"},
+            {"role": "assistant", "content": "Understood, I will take it into account."},
+            *messages
+        ]
+    return messages
+
+
+def schedule_summary(chatbot, until):
+    if chatbot.chatbot_id in _summarizing:
+        return
+    _summarizing.add(chatbot.chatbot_id)
+    # Turns not yet migrated out of Chatbot.history predate every chat_turn
+    legacy_turns = list(chatbot.history)
+    task = asyncio.create_task(extend_summary(
+        chatbot.chatbot_id, chatbot.history_summary, chatbot.summary_until, until, legacy_turns,
+        chatbot.history_generation
+    ))
+    _summary_tasks.add(task)
+
+    def done(task):
+        _summary_tasks.discard(task)
+        _summarizing.discard(chatbot.chatbot_id)
+
+    task.add_done_callback(done)
+
+
+async def unsummarized_turns(chatbot_id, summary_until, until, legacy_turns):
+    """Next batch of turns after summary_until and up to until, oldest first"""
+    turns = [
+        item for item in legacy_turns
+        if (summary_until is None or item.timestamp > summary_until) and item.timestamp <= until
+    ][:HISTORY_SUMMARY_BATCH_TURNS]
+    if len(turns) < HISTORY_SUMMARY_BATCH_TURNS:
+        turns += await get_chat_turns_between(
+            chatbot_id, summary_until, until, HISTORY_SUMMARY_BATCH_TURNS - len(turns)
+        )
+    return turns
+
+
+async def summarize_turns(summary, turns):
+    """Fold new turns into the previous summary with the summary model"""
+    model_enum = ModelName[HISTORY_SUMMARY_MODEL]
+    client = client_registry.async_openai(MODELS[model_enum]["api_key"])
+    prompt = SUMMARY_PROMPT.format(
+        max_words=int(HISTORY_SUMMARY_MAX_TOKENS * 0.6),
+        summary=summary or "(none)",
+        turns="\n\n".join(f"User: {item.question}\nAssistant: {item.answer}" for item in turns)
+    )
+    response = await client.chat.completions.create(
+        model=model_enum.value,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.0,
+        max_tokens=HISTORY_SUMMARY_MAX_TOKENS
+    )
+    return response.choices[0].message.content.strip()
+
+
+async def extend_summary(chatbot_id, summary, summary_until, until, legacy_turns, generation=0):
+    """Fold every turn after summary_until and up to until into the summary, a batch at a time"""
+    try:
+        summarized = 0
+        while True:
+            new_turns = await unsummarized_turns(chatbot_id, summary_until, until, legacy_turns)
+            if not new_turns:
+                break
+            updated = await summarize_turns(summary, new_turns)
+            stored = await update_history_summary(
+                chatbot_id, updated, new_turns[-1].timestamp,
+                previous_until=summary_until, generation=generation
+            )
+            if not stored:
+                # Another worker advanced the summary, or the history was cleared
+                break
+            summary, summary_until = updated, new_turns[-1].timestamp
+            summarized += len(new_turns)
+        if summarized:
+            logger.info(f"Summarized {summarized} older turns of chatbot {chatbot_id}")
+    except Exception as e:
+        logger.error(f"Failed to update history summary of chatbot {chatbot_id}: {str(e)}")
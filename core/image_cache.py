@@ -0,0 +1,86 @@
+import os
+import asyncio
+import threading
+import logging
+from collections import OrderedDict
+
+from commons.blob_store import get_blob_store
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Memory budget for hot image bytes, in megabytes
+IMAGE_CACHE_MB = float(os.getenv("IMAGE_CACHE_MB", "64"))
+# Images larger than this are always read from the blob store
+IMAGE_CACHE_MAX_ITEM_MB = float(os.getenv("IMAGE_CACHE_MAX_ITEM_MB", "4"))
+
+
+class ImageBytesCache:
+    """Process-wide LRU of image bytes keyed by content hash.
+
+    Blobs are immutable, so entries never go stale and need no invalidation.
+    """
+
+    def __init__(self, max_bytes, max_item_bytes):
+        self.max_bytes = int(max_bytes)
+        self.max_item_bytes = int(max_item_bytes)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, hash):
+        with self._lock:
+            data = self._entries.get(hash)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(hash)
+            self.hits += 1
+            return data
+
+    def put(self, hash, data):
+        if len(data) > self.max_item_bytes:
+            return
+        with self._lock:
+            if hash in self._entries:
+                self._entries.move_to_end(hash)
+                return
+            self._entries[hash] = data
+            self.current_bytes += len(data)
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+
+image_cache = ImageBytesCache(
+    max_bytes=IMAGE_CACHE_MB * 1024 * 1024,
+    max_item_bytes=IMAGE_CACHE_MAX_ITEM_MB * 1024 * 1024
+)
+
+
+async def aget_image_bytes(hash, mime=None):
+    """Image bytes for a blob hash, from memory when hot, otherwise from the blob store"""
+    data = image_cache.get(hash)
+    if data is not None:
+        return data
+    data = await asyncio.to_thread(get_blob_store().get, hash, mime)
+    if data is not None:
+        image_cache.put(hash, data)
+    return data
@@ -0,0 +1,105 @@
+import os
+import threading
+import logging
+from collections import OrderedDict
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Memory budget for resident vector indexes, in megabytes
+VECTOR_INDEX_CACHE_MB = float(os.getenv("VECTOR_INDEX_CACHE_MB", "512"))
+
+
+def file_signature(*paths):
+    """Return a tuple of modification times identifying the current version of the files"""
+    signature = []
+    for path in paths:
+        try:
+            signature.append(os.stat(path).st_mtime_ns)
+        except (OSError, TypeError):
+            signature.append(None)
+    return tuple(signature)
+
+
+class VectorIndexCache:
+    """Process-wide LRU cache of loaded vector indexes with a memory budget.
+
+    Entries are keyed by document id and tagged with the mtimes of the files
+    they were loaded from, so a re-upload is picked up on the next lookup.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_load(self, key, signature, loader):
+        """Return the cached index for key, calling loader() on a miss or stale entry.
+
+        loader must return a tuple (index, nbytes).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Load outside the lock so a slow load does not block warm lookups
+        index, nbytes = loader()
+
+        with self._lock:
+            self._remove(key)
+            if nbytes > self.max_bytes:
+                logger.warning(f"Vector index {key} ({nbytes} bytes) exceeds cache budget, not caching")
+                return index
+            self._entries[key] = (signature, index, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+                evicted_key, _ = next(iter(self._entries.items()))
+                self._remove(evicted_key)
+                self.evictions += 1
+                logger.info(f"Evicted vector index {evicted_key} from cache")
+        return index
+
+    def peek(self, key):
+        """Return the cached index for key without loading, refreshing or counting a lookup"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def invalidate(self, key):
+        """Drop a single entry, e.g. after a document is re-ingested"""
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+
+index_cache = VectorIndexCache(max_bytes=VECTOR_INDEX_CACHE_MB * 1024 * 1024)
@@ -0,0 +1,103 @@
+import os
+import sys
+import asyncio
+import logging
+from datetime import timedelta
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.job import claim_next_job, finish_job, requeue_stale_jobs
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Number of ingest jobs processed at the same time by this process
+INGEST_JOB_CONCURRENCY = int(os.getenv("INGEST_JOB_CONCURRENCY", "1"))
+# How often idle workers check the queue for jobs enqueued by other processes
+INGEST_JOB_POLL_SECONDS = float(os.getenv("INGEST_JOB_POLL_SECONDS", "5"))
+# Running jobs without progress for this long are requeued, e.g. after a worker process died
+INGEST_JOB_STALE_MINUTES = float(os.getenv("INGEST_JOB_STALE_MINUTES", "30"))
+# How often stale jobs are looked for while the worker runs
+INGEST_JOB_REQUEUE_SECONDS = float(os.getenv("INGEST_JOB_REQUEUE_SECONDS", "300"))
+INGEST_JOB_MAX_ATTEMPTS = int(os.getenv("INGEST_JOB_MAX_ATTEMPTS", "3"))
+
+
+class IngestWorker:
+    """Pulls ingest jobs from the persistent queue and runs them with bounded concurrency.
+
+    The handler is an async function taking the claimed IngestJob; it reports
+    its own stage progress and raises on failure.
+    """
+
+    def __init__(self, handler, concurrency=INGEST_JOB_CONCURRENCY, poll_seconds=INGEST_JOB_POLL_SECONDS):
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.poll_seconds = poll_seconds
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+
+    async def start(self):
+        await requeue_stale_jobs(timedelta(minutes=INGEST_JOB_STALE_MINUTES))
+        self._tasks = [asyncio.create_task(self._run(i)) for i in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._requeue_stale()))
+        logger.info(f"Started {self.concurrency} ingest worker(s)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers after a job has been enqueued"""
+        self._wakeup.set()
+
+    async def _requeue_stale(self):
+        """Periodically requeue jobs abandoned by workers of any process"""
+        while True:
+            await asyncio.sleep(INGEST_JOB_REQUEUE_SECONDS)
+            try:
+                if await requeue_stale_jobs(timedelta(minutes=INGEST_JOB_STALE_MINUTES)):
+                    self.notify()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Could not requeue stale ingest jobs: {str(e)}")
+
+    async def _run(self, worker_index):
+        while True:
+            try:
+                job = await claim_next_job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ingest worker {worker_index} could not claim a job: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._process(job)
+
+    async def _process(self, job):
+        if job.attempts > INGEST_JOB_MAX_ATTEMPTS:
+            await finish_job(job.job_id, "failed", error=f"Gave up after {INGEST_JOB_MAX_ATTEMPTS} attempts")
+            return
+        logger.info(f"Processing ingest job {job.job_id} (attempt {job.attempts})")
+        try:
+            await self.handler(job)
+        except asyncio.CancelledError:
+            # Shutdown: leave the job running so it is requeued once stale
+            raise
+        except Exception as e:
+            logger.error(f"Ingest job {job.job_id} failed: {str(e)}", exc_info=True)
+            await finish_job(job.job_id, "failed", error=str(e))
+            return
+        await finish_job(job.job_id, "done")
+        logger.info(f"Ingest job {job.job_id} finished")
@@ -0,0 +1,127 @@
+import os
+import re
+import unicodedata
+from collections import Counter
+import numpy as np
+
+LEXICAL_INDEX_SUFFIX = ".lex.npz"
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Latin words and model numbers such as "f2", "cf-fv3" or "windows11"
+WORD_PATTERN = re.compile(r"[0-9a-z]+(?:[-_.][0-9a-z]+)*")
+# Runs of Japanese/Chinese characters (hiragana, katakana, kanji)
+CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+
+def tokenize(text):
+    """Split text into terms: lowercase latin words plus character bigrams of CJK runs"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    tokens = WORD_PATTERN.findall(text)
+    for run in CJK_PATTERN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def lexical_index_path(vector_path):
+    """Path of the lexical index stored next to a vector file"""
+    return os.path.splitext(vector_path)[0] + LEXICAL_INDEX_SUFFIX
+
+
+class LexicalIndex:
+    """Compact BM25 inverted index with postings stored as CSR arrays"""
+
+    def __init__(self, terms, indptr, doc_ids, term_freqs, doc_lengths):
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.n_docs = len(doc_lengths)
+        self.avg_length = float(doc_lengths.mean()) if self.n_docs else 0.0
+        doc_freqs = np.diff(indptr)
+        self.idf = np.log1p((self.n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+
+    @classmethod
+    def build(cls, chunks):
+        postings = {}
+        doc_lengths = np.zeros(len(chunks), dtype=np.float32)
+        for doc_id, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk))
+            doc_lengths[doc_id] = sum(counts.values())
+            for term, count in counts.items():
+                postings.setdefault(term, []).append((doc_id, count))
+
+        terms = sorted(postings)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_ids, term_freqs = [], []
+        for i, term in enumerate(terms):
+            for doc_id, count in postings[term]:
+                doc_ids.append(doc_id)
+                term_freqs.append(count)
+            indptr[i + 1] = len(doc_ids)
+        return cls(
+            terms,
+            indptr,
+            np.array(doc_ids, dtype=np.int32),
+            np.array(term_freqs, dtype=np.float32),
+            doc_lengths
+        )
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            # Terms never contain newlines, so they are stored as one UTF-8 blob
+            terms=np.frombuffer("\n".join(self.terms).encode('utf-8'), dtype=np.uint8),
+            indptr=self.indptr,
+            doc_ids=self.doc_ids,
+            term_freqs=self.term_freqs,
+            doc_lengths=self.doc_lengths
+        )
+        os.replace(tmp_path, path)
+        print(f"Lexical index saved to {path} ({len(self.terms)} terms)")
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            blob = data["terms"].tobytes().decode('utf-8')
+            terms = blob.split("\n") if blob else []
+            return cls(terms, data["indptr"], data["doc_ids"], data["term_freqs"], data["doc_lengths"])
+
+    @property
+    def nbytes(self):
+        terms_bytes = sum(len(term.encode('utf-8')) for term in self.terms)
+        return terms_bytes + self.indptr.nbytes + self.doc_ids.nbytes + self.term_freqs.nbytes + self.doc_lengths.nbytes
+
+    def scores(self, query):
+        """BM25 score of every document for query"""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        if not self.n_docs:
+            return scores
+        for term, query_count in Counter(tokenize(query)).items():
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.term_freqs[start:end]
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[docs] / self.avg_length)
+            scores[docs] += query_count * self.idf[term_id] * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query, k):
+        """Return (indices, scores) of the top k documents with a positive score, best first"""
+        scores = self.scores(query)
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        order = matched[np.argsort(-scores[matched])]
+        return order, scores[order]
@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.chunking import chunk_pages, save_chunks
+from core.embedding import batch_embed
+from core.vector_store import write_vector_store
+from core.lexical_index import LexicalIndex, lexical_index_path
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Worker pool for ingestion so chunking and embedding never run on the request thread
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+ingest_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+
+
+def chunk_texts(chunks):
+    """Texts sent to the embedder, built the same way core.retrieve.load_documents builds them"""
+    return [f"{chunk['title']} {chunk['snippet']}" for chunk in chunks]
+
+
+def run_ingestion(pages, documents_filepath, vector_filepath):
+    """Chunk pages, embed the chunks and write the documents, vector and lexical files.
+
+    Stages pass their results in memory; returns per-stage timings in seconds.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    chunks = chunk_pages(pages)
+    save_chunks(chunks, documents_filepath)
+    texts = chunk_texts(chunks)
+    if not texts:
+        raise ValueError("No chunks were produced from the document pages")
+    timings["chunk"] = time.perf_counter() - start
+    logger.info(f"Created {len(chunks)} chunks from {len(pages)} pages in {timings['chunk']:.2f}s")
+
+    start = time.perf_counter()
+    embeddings = batch_embed(texts)
+    timings["embed"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    write_vector_store(vector_filepath, np.array(embeddings, dtype=np.float32).reshape(len(texts), -1), texts)
+    timings["vector_store"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    LexicalIndex.build(texts).save(lexical_index_path(vector_filepath))
+    timings["lexical_index"] = time.perf_counter() - start
+
+    logger.info("Ingestion timings: " + ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in timings.items()))
+    return timings
+
+
+async def arun_ingestion(pages, documents_filepath, vector_filepath):
+    """Run run_ingestion on the ingestion worker pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        ingest_executor,
+        partial(run_ingestion, pages, documents_filepath, vector_filepath)
+    )
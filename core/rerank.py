@@ -0,0 +1,160 @@
+import os
+import re
+import time
+import asyncio
+import logging
+import threading
+from dotenv import load_dotenv
+from LLM.clients import client_registry
+
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+API_KEY = os.getenv("COHERE_API_KEY")
+
+# "cohere", "local" or "none"
+RERANKER = os.getenv("RERANKER", "cohere")
+RERANK_MODEL = os.getenv("RERANK_MODEL", "rerank-multilingual-v3.0")
+# Latency budget for the rerank stage in seconds; past it the vector order is used
+RERANK_TIMEOUT = float(os.getenv("RERANK_TIMEOUT", "2.0"))
+
+
+class CohereReranker:
+    """Cross-encoder rerank through the Cohere rerank endpoint"""
+
+    def __init__(self, model=RERANK_MODEL):
+        self.model = model
+        self.client = client_registry.cohere(API_KEY)
+        self.async_client = client_registry.async_cohere(API_KEY)
+
+    def rerank(self, query, documents, top_n, timeout=None):
+        """Return (index, score) pairs for the top_n documents, best first"""
+        response = self.client.rerank(
+            model=self.model,
+            query=query,
+            documents=documents,
+            top_n=top_n,
+            request_options={"timeout_in_seconds": timeout} if timeout else None
+        )
+        return [(result.index, result.relevance_score) for result in response.results]
+
+    async def arerank(self, query, documents, top_n):
+        response = await self.async_client.rerank(
+            model=self.model,
+            query=query,
+            documents=documents,
+            top_n=top_n
+        )
+        return [(result.index, result.relevance_score) for result in response.results]
+
+
+class LocalReranker:
+    """Network-free stand-in that scores documents by character bigram overlap with the query.
+
+    Useful for tests and for running without a Cohere key; it handles
+    Japanese text since it does not rely on whitespace tokenization.
+    """
+
+    @staticmethod
+    def _bigrams(text):
+        text = re.sub(r"\s+", "", text.casefold())
+        return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+    def rerank(self, query, documents, top_n, timeout=None):
+        query_grams = self._bigrams(query)
+        scores = []
+        for i, document in enumerate(documents):
+            overlap = len(query_grams & self._bigrams(document))
+            scores.append((i, overlap / len(query_grams)))
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:top_n]
+
+    async def arerank(self, query, documents, top_n):
+        return self.rerank(query, documents, top_n)
+
+
+class RerankStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.total_seconds = 0.0
+
+    def record(self, seconds, outcome):
+        with self._lock:
+            self.calls += 1
+            self.total_seconds += seconds
+            if outcome == "timeout":
+                self.timeouts += 1
+            elif outcome == "error":
+                self.failures += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "reranker": RERANKER,
+                "calls": self.calls,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+                "avg_ms": 1000 * self.total_seconds / self.calls if self.calls else 0.0
+            }
+
+
+rerank_stats = RerankStats()
+_reranker = None
+
+
+def get_reranker():
+    """Return the configured reranker, or None when reranking is disabled"""
+    global _reranker
+    if _reranker is None and RERANKER != "none":
+        _reranker = LocalReranker() if RERANKER == "local" else CohereReranker()
+    return _reranker
+
+
+def _apply(candidates, ranking):
+    return [(candidates[index][0], float(score)) for index, score in ranking]
+
+
+def rerank_results(query, candidates, top_n, reranker=None, timeout=RERANK_TIMEOUT):
+    """Rerank (chunk, score) candidates down to top_n, falling back to vector order on timeout or error"""
+    reranker = reranker or get_reranker()
+    if reranker is None or len(candidates) <= 1:
+        return candidates[:top_n]
+    start = time.perf_counter()
+    try:
+        ranking = reranker.rerank(query, [chunk for chunk, _ in candidates], top_n, timeout=timeout)
+    except Exception as e:
+        elapsed = time.perf_counter() - start
+        outcome = "timeout" if timeout and elapsed >= timeout else "error"
+        rerank_stats.record(elapsed, outcome)
+        logger.warning(f"Rerank {outcome} after {elapsed * 1000:.0f} ms, using vector order: {str(e)}")
+        return candidates[:top_n]
+    rerank_stats.record(time.perf_counter() - start, "ok")
+    return _apply(candidates, ranking)
+
+
+async def arerank_results(query, candidates, top_n, reranker=None, timeout=RERANK_TIMEOUT):
+    """Async variant of rerank_results; the budget is enforced with asyncio.wait_for"""
+    reranker = reranker or get_reranker()
+    if reranker is None or len(candidates) <= 1:
+        return candidates[:top_n]
+    start = time.perf_counter()
+    try:
+        ranking = await asyncio.wait_for(
+            reranker.arerank(query, [chunk for chunk, _ in candidates], top_n),
+            timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        rerank_stats.record(time.perf_counter() - start, "timeout")
+        logger.warning(f"Rerank exceeded {timeout * 1000:.0f} ms budget, using vector order")
+        return candidates[:top_n]
+    except Exception as e:
+        rerank_stats.record(time.perf_counter() - start, "error")
+        logger.warning(f"Rerank failed, using vector order: {str(e)}")
+        return candidates[:top_n]
+    rerank_stats.record(time.perf_counter() - start, "ok")
+    return _apply(candidates, ranking)
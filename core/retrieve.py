@@ -1,14 +1,45 @@
 import json
-import cohere
 import os
 from dotenv import load_dotenv
 import numpy as np
 import pickle
+import asyncio
+import time
+import logging
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from core.index_cache import index_cache, file_signature
+from core.vector_store import is_vector_store, open_vector_store
+from core.embedding_cache import query_embedding_cache, normalize_query
+from core.rerank import rerank_results, arerank_results
+from core.lexical_index import LexicalIndex, lexical_index_path
+from LLM.clients import client_registry
 
 load_dotenv()
 
+# Configure logging
+logger = logging.getLogger(__name__)
+
 API_KEY = os.getenv("COHERE_API_KEY")
-co = cohere.ClientV2(api_key=API_KEY)
+
+EMBED_MODEL = 'embed-multilingual-v3.0'
+
+# Bounded pool for index loading and scoring so CPU work stays off the event loop
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+retrieval_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+
+# Two-stage retrieval: vector recall of RECALL_K candidates, reranked down to RERANK_K
+RECALL_K = int(os.getenv("RECALL_K", "30"))
+RERANK_K = int(os.getenv("RERANK_K", "5"))
+# Latency budget for the vector recall stage (embed + score) in seconds
+RECALL_TIMEOUT = float(os.getenv("RECALL_TIMEOUT", "5.0"))
+
+# "hybrid" fuses BM25 and vector rankings with reciprocal rank fusion, "vector" uses embeddings only
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Rows of a float16 matrix upcast to float32 per scoring block; bounds the per-query copy
+SCORE_BLOCK_ROWS = int(os.getenv("SCORE_BLOCK_ROWS", "16384"))
 
 def load_documents(documents_path):
     """Load documents from JSON file"""
@@ -33,37 +64,242 @@ def load_vector_database(vector_path):
 
 def embed_query(query):
     """Embed query and return embedding"""
-    response = co.embed(
-        texts=[query],
-        model='embed-multilingual-v3.0',
+    return embed_queries([query])[0]
+
+def _lookup_cached(queries):
+    """Return cached embeddings (None for misses) and the misses grouped by normalized query.
+
+    Each group holds the indices of queries that share one embedding, so a
+    query repeated within a batch is embedded once.
+    """
+    embeddings = [query_embedding_cache.get(query, EMBED_MODEL) for query in queries]
+    missing = {}
+    for i, embedding in enumerate(embeddings):
+        if embedding is None:
+            missing.setdefault(normalize_query(queries[i]), []).append(i)
+    return embeddings, list(missing.values())
+
+def _fill_missing(queries, embeddings, missing, response):
+    for group, embedding in zip(missing, response.embeddings.float):
+        embedding = np.asarray(embedding, dtype=np.float32)
+        for i in group:
+            embeddings[i] = embedding
+        query_embedding_cache.put(queries[group[0]], EMBED_MODEL, embedding)
+    return np.stack(embeddings)
+
+def embed_queries(queries):
+    """Embed a batch of queries and return a (n, dim) float32 matrix.
+
+    Cached embeddings are reused; only the misses go to Cohere, in one request.
+    """
+    queries = list(queries)
+    embeddings, missing = _lookup_cached(queries)
+    if not missing:
+        return np.stack(embeddings)
+    response = client_registry.cohere(API_KEY).embed(
+        texts=[queries[group[0]] for group in missing],
+        model=EMBED_MODEL,
         input_type="search_query",
         embedding_types=['float']
     )
-    return np.array(response.embeddings.float[0])
+    return _fill_missing(queries, embeddings, missing, response)
+
+async def aembed_queries(queries):
+    """Async variant of embed_queries using the async Cohere client.
+
+    With a disk tier the cache lookups and stores run in the retrieval pool,
+    so SQLite reads and commits never block the event loop.
+    """
+    queries = list(queries)
+    persistent = query_embedding_cache.persistent
+    if persistent:
+        embeddings, missing = await _run_in_pool(_lookup_cached, queries)
+    else:
+        embeddings, missing = _lookup_cached(queries)
+    if not missing:
+        return np.stack(embeddings)
+    response = await client_registry.async_cohere(API_KEY).embed(
+        texts=[queries[group[0]] for group in missing],
+        model=EMBED_MODEL,
+        input_type="search_query",
+        embedding_types=['float']
+    )
+    if persistent:
+        return await _run_in_pool(_fill_missing, queries, embeddings, missing, response)
+    return _fill_missing(queries, embeddings, missing, response)
 
 def cosine_similarity(a, b):
     """Calculate cosine similarity between 2 vectors"""
     return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
-def retrieve_and_rerank(query, documents_path, vector_path, k=10, rerank_k=10):
-    """Retrieve top k chunks most similar to query"""
-    # Load documents and vectors
-    chunks = load_documents(documents_path)
-    with open(vector_path, 'rb') as f:
-        vector_data = pickle.load(f)
-    embeddings = [vector_data[i] for i in range(len(chunks))]
-    
-    # Calculate embedding for query
-    query_embedding = embed_query(query)
-    
-    # Calculate similarity between query and all chunks
-    similarities = [cosine_similarity(query_embedding, chunk_embedding) 
-                   for chunk_embedding in embeddings]
+def normalize_rows(matrix):
+    """L2-normalize each row of a matrix, leaving all-zero rows untouched"""
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def load_lexical_index(vector_path, chunks):
+    """Load the lexical index built at upload time, or build it in memory for older uploads"""
+    path = lexical_index_path(vector_path)
+    if os.path.exists(path):
+        return LexicalIndex.load(path)
+    logger.info(f"No lexical index at {path}, building it from {len(chunks)} chunks")
+    return LexicalIndex.build(list(chunks))
+
+def load_index(documents_path, vector_path):
+    """Load chunks, their pre-normalized embedding matrix and lexical index, returned with their approximate size in bytes"""
+    if is_vector_store(vector_path):
+        # Binary store: matrix and chunk texts are memory-mapped, nothing is copied to the heap
+        store = open_vector_store(vector_path)
+        matrix = store.matrix if store.normalized else normalize_rows(store.matrix)
+        chunks = store.chunks
+        nbytes = store.nbytes
+    else:
+        # Legacy pickle + documents.json pair
+        chunks = load_documents(documents_path)
+        with open(vector_path, 'rb') as f:
+            vector_data = pickle.load(f)
+        matrix = normalize_rows(np.stack([vector_data[i] for i in range(len(chunks))]))
+        nbytes = matrix.nbytes + sum(len(c.encode('utf-8')) for c in chunks)
+
+    lexical = load_lexical_index(vector_path, chunks) if RETRIEVAL_MODE == "hybrid" else None
+    if lexical is not None:
+        nbytes += lexical.nbytes
+    return (chunks, matrix, lexical), nbytes
+
+def get_index(documents_path, vector_path, document_id=None):
+    """Return (chunks, matrix, lexical) for a document, served from the process-wide cache when warm"""
+    key = document_id or vector_path
+    paths = (documents_path, vector_path, lexical_index_path(vector_path))
+    signature = paths + file_signature(*paths)
+    return index_cache.get_or_load(key, signature, lambda: load_index(documents_path, vector_path))
+
+def score_matrix(matrix, queries, block_rows=SCORE_BLOCK_ROWS):
+    """Similarity of float32 queries to every row of a float32 or float16 matrix"""
+    if matrix.dtype == np.float32:
+        # One BLAS call scores every chunk for every query
+        return queries @ matrix.T
+    # Upcast a float16 (memmapped) matrix block by block instead of copying all of it per query
+    scores = np.empty((queries.shape[0], matrix.shape[0]), dtype=np.float32)
+    for start in range(0, matrix.shape[0], block_rows):
+        block = np.asarray(matrix[start:start + block_rows], dtype=np.float32)
+        scores[:, start:start + block_rows] = queries @ block.T
+    return scores
+
+def top_k(matrix, query_embeddings, k):
+    """Score a batch of queries against a normalized matrix and return (indices, scores) of the top k per query"""
+    queries = normalize_rows(np.atleast_2d(query_embeddings))
+    scores = score_matrix(matrix, queries)
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1)
+    indices = np.take_along_axis(candidates, order, axis=1)
+    return indices, np.take_along_axis(candidate_scores, order, axis=1)
+
+def fuse_rrf(rankings, k, rrf_k=RRF_K):
+    """Reciprocal rank fusion of several rankings of chunk indices, returning (index, score) pairs"""
+    fused = {}
+    for ranking in rankings:
+        for rank, index in enumerate(ranking):
+            fused[int(index)] = fused.get(int(index), 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+
+def rank_chunks(queries, index, query_embeddings, k):
+    """Rank chunks for each query by vector similarity, fused with BM25 when a lexical index is loaded.
+
+    query_embeddings may be None when embedding failed, in which case only BM25 is used.
+    """
+    chunks, matrix, lexical = index
+    if query_embeddings is not None:
+        vector_indices, vector_scores = top_k(matrix, query_embeddings, k)
+    results = []
+    for i, query in enumerate(queries):
+        if lexical is None:
+            results.append([(chunks[j], float(score)) for j, score in zip(vector_indices[i], vector_scores[i])])
+            continue
+        rankings = [lexical.search(query, k)[0]]
+        if query_embeddings is not None:
+            rankings.append(vector_indices[i])
+        results.append([(chunks[j], score) for j, score in fuse_rrf(rankings, k)])
+    return results
+
+def retrieve_batch(queries, documents_path, vector_path, k=10, document_id=None):
+    """Retrieve the top k chunks for each query in a batch, returning one result list per query"""
+    index = get_index(documents_path, vector_path, document_id)
     
-    # Get top k indices with highest similarity
-    top_indices = np.argsort(similarities)[::-1][:k]
+    # Embed all queries in a single request
+    try:
+        query_embeddings = embed_queries(queries)
+    except Exception as e:
+        if index[2] is None:
+            raise
+        logger.warning(f"Query embedding failed, falling back to lexical retrieval: {str(e)}")
+        query_embeddings = None
     
-    # Get corresponding chunks and scores
-    results = [(chunks[i], similarities[i]) for i in top_indices]
+    return rank_chunks(queries, index, query_embeddings, k)
+
+def retrieve_and_rerank(query, documents_path, vector_path, k=RECALL_K, rerank_k=RERANK_K, document_id=None, reranker=None):
+    """Recall the k chunks most similar to query, then rerank them down to rerank_k"""
+    start = time.perf_counter()
+    candidates = retrieve_batch([query], documents_path, vector_path, k=k, document_id=document_id)[0]
+    recalled = time.perf_counter()
+    results = rerank_results(query, candidates, rerank_k, reranker=reranker)
+    logger.info(f"Retrieved {len(results)}/{len(candidates)} chunks (recall {(recalled - start) * 1000:.0f} ms, rerank {(time.perf_counter() - recalled) * 1000:.0f} ms)")
+    return results
+
+async def _run_in_pool(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(retrieval_executor, partial(func, *args, **kwargs))
+
+async def aretrieve_batch(queries, documents_path, vector_path, k=10, document_id=None):
+    """Async variant of retrieve_batch that never blocks the event loop"""
+    # Load the index in the pool while the query embedding is in flight
+    index_future = asyncio.ensure_future(_run_in_pool(get_index, documents_path, vector_path, document_id))
+    try:
+        query_embeddings = await aembed_queries(queries)
+        embed_error = None
+    except asyncio.CancelledError:
+        index_future.cancel()
+        raise
+    except Exception as e:
+        query_embeddings, embed_error = None, e
+    index = await index_future
+    if embed_error is not None:
+        if index[2] is None:
+            raise embed_error
+        logger.warning(f"Query embedding failed, falling back to lexical retrieval: {str(embed_error)}")
     
+    return await _run_in_pool(rank_chunks, queries, index, query_embeddings, k)
+
+async def recall_fallback(query, vector_path, k, document_id=None):
+    """Candidates after the recall budget ran out: BM25 over an already loaded index, otherwise none"""
+    index = index_cache.peek(document_id or vector_path)
+    if index is None or index[2] is None:
+        logger.warning(f"Recall exceeded {RECALL_TIMEOUT * 1000:.0f} ms budget, answering without context")
+        return []
+    logger.warning(f"Recall exceeded {RECALL_TIMEOUT * 1000:.0f} ms budget, falling back to lexical retrieval")
+    return (await _run_in_pool(rank_chunks, [query], index, None, k))[0]
+
+async def aretrieve(query, documents_path, vector_path, k=RECALL_K, rerank_k=RERANK_K, document_id=None, reranker=None):
+    """Async variant of retrieve_and_rerank with a latency budget on each stage"""
+    start = time.perf_counter()
+    try:
+        candidates = await asyncio.wait_for(
+            aretrieve_batch([query], documents_path, vector_path, k=k, document_id=document_id),
+            timeout=RECALL_TIMEOUT
+        )
+        candidates = candidates[0]
+    except asyncio.TimeoutError:
+        candidates = await recall_fallback(query, vector_path, k, document_id)
+    recalled = time.perf_counter()
+    results = await arerank_results(query, candidates, rerank_k, reranker=reranker)
+    logger.info(f"Retrieved {len(results)}/{len(candidates)} chunks (recall {(recalled - start) * 1000:.0f} ms, rerank {(time.perf_counter() - recalled) * 1000:.0f} ms)")
     return results
@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import asyncio
+import threading
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Buffer text deltas for up to this many milliseconds before sending a frame; 0 disables coalescing
+SSE_COALESCE_MS = float(os.getenv("SSE_COALESCE_MS", "0"))
+# Flush buffered text early once it reaches this many bytes
+SSE_COALESCE_BYTES = int(os.getenv("SSE_COALESCE_BYTES", "1024"))
+
+
+class StreamEvent:
+    """One event of a streamed answer, passed from the provider adapters to the SSE encoder.
+
+    type is one of:
+      text        answer text delta
+      thinking    model reasoning delta, not part of the answer
+      block_start / block_stop
+                  content block boundaries (block_type names the block)
+      info        progress notice such as a retry
+      images      image references seen so far
+      done        terminal success event with the full answer and its images
+      error       terminal failure event
+    """
+
+    __slots__ = ("type", "text", "block_type", "images", "answer")
+
+    def __init__(self, type, text=None, block_type=None, images=None, answer=None):
+        self.type = type
+        self.text = text
+        self.block_type = block_type
+        self.images = images
+        self.answer = answer
+
+    @classmethod
+    def delta(cls, text):
+        return cls("text", text=text)
+
+    @classmethod
+    def info(cls, text):
+        return cls("info", text=text)
+
+    @classmethod
+    def error(cls, message):
+        return cls("error", text=message)
+
+    @classmethod
+    def done(cls, answer, images):
+        return cls("done", answer=answer, images=images)
+
+    @property
+    def terminal(self):
+        return self.type in ("done", "error")
+
+    def to_payload(self):
+        """Wire format of the event, as clients of the SSE endpoints expect it"""
+        if self.type == "text":
+            return {"text": self.text}
+        if self.type == "done":
+            return {"done": True, "answer": self.answer, "images": self.images}
+        if self.type == "error":
+            return {"error": self.text}
+        if self.type == "info":
+            return {"info": self.text}
+        if self.type == "images":
+            return {"type": "images", "images": self.images}
+        if self.type == "block_start":
+            return {"type": "block_start", "block_type": self.block_type}
+        if self.type == "thinking":
+            return {"type": "thinking", "thinking": self.text}
+        return {"type": self.type}
+
+    def __repr__(self):
+        return f"StreamEvent({self.type!r}, text={self.text!r})"
+
+
+def encode_event(event):
+    """Encode one StreamEvent as a server-sent events frame"""
+    return f"data: {json.dumps(event.to_payload())}\n\n"
+
+
+class StreamStats:
+    """Process-wide counters of SSE traffic, with per-stream frame and byte rates"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.active_streams = 0
+        self.frames = 0
+        self.bytes = 0
+        self.deltas = 0
+        self.seconds = 0.0
+        self.last_stream = None
+
+    def start(self):
+        with self._lock:
+            self.active_streams += 1
+
+    def finish(self, frames, nbytes, deltas, seconds):
+        stream = {
+            "frames": frames,
+            "bytes": nbytes,
+            "deltas": deltas,
+            "seconds": seconds,
+            "frames_per_second": frames / seconds if seconds else 0.0,
+            "bytes_per_second": nbytes / seconds if seconds else 0.0
+        }
+        with self._lock:
+            self.active_streams -= 1
+            self.streams += 1
+            self.frames += frames
+            self.bytes += nbytes
+            self.deltas += deltas
+            self.seconds += seconds
+            self.last_stream = stream
+        logger.info(
+            f"SSE stream: {frames} frames from {deltas} deltas, {nbytes} bytes in {seconds:.2f}s "
+            f"({stream['frames_per_second']:.1f} frames/s, {stream['bytes_per_second']:.0f} B/s)"
+        )
+
+    def stats(self):
+        with self._lock:
+            return {
+                "streams": self.streams,
+                "active_streams": self.active_streams,
+                "frames": self.frames,
+                "bytes": self.bytes,
+                "text_deltas": self.deltas,
+                "frames_per_second": self.frames / self.seconds if self.seconds else 0.0,
+                "bytes_per_second": self.bytes / self.seconds if self.seconds else 0.0,
+                "last_stream": self.last_stream,
+                "coalesce_ms": SSE_COALESCE_MS,
+                "coalesce_bytes": SSE_COALESCE_BYTES
+            }
+
+
+stream_stats = StreamStats()
+
+
+async def sse_stream(events, coalesce_ms=SSE_COALESCE_MS, coalesce_bytes=SSE_COALESCE_BYTES, stats=stream_stats):
+    """Encode an async iterator of StreamEvents as SSE frames.
+
+    Frames are sent as soon as they are produced. With coalesce_ms > 0,
+    consecutive text events are merged into one frame that is
+    flushed after coalesce_ms or once it holds coalesce_bytes, whichever
+    comes first; any other event flushes pending text first so ordering is
+    preserved.
+    """
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    frames = nbytes = deltas = 0
+    buffer = []
+    buffered_bytes = 0
+    deadline = None
+    iterator = events.__aiter__()
+    pending = None
+    stats.start()
+
+    def emit(event):
+        nonlocal frames, nbytes
+        frame = encode_event(event)
+        frames += 1
+        nbytes += len(frame)
+        return frame
+
+    def flush():
+        nonlocal buffer, buffered_bytes, deadline
+        text = "".join(buffer)
+        buffer, buffered_bytes, deadline = [], 0, None
+        return emit(StreamEvent.delta(text))
+
+    try:
+        while True:
+            if coalesce_ms <= 0:
+                try:
+                    event = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+            else:
+                # Wait for the next event, but no longer than the pending text may be held
+                if pending is None:
+                    pending = asyncio.ensure_future(iterator.__anext__())
+                timeout = max(0.0, deadline - loop.time()) if buffer else None
+                done, _ = await asyncio.wait({pending}, timeout=timeout)
+                if not done:
+                    yield flush()
+                    continue
+                task, pending = pending, None
+                try:
+                    event = task.result()
+                except StopAsyncIteration:
+                    break
+
+            if event.type == "text":
+                deltas += 1
+                if coalesce_ms > 0:
+                    buffer.append(event.text)
+                    buffered_bytes += len(event.text.encode("utf-8"))
+                    if deadline is None:
+                        deadline = loop.time() + coalesce_ms / 1000
+                    if buffered_bytes < coalesce_bytes:
+                        continue
+                    yield flush()
+                    continue
+            elif buffer:
+                yield flush()
+
+            yield emit(event)
+
+        if buffer:
+            yield flush()
+    finally:
+        if pending is not None:
+            pending.cancel()
+        stats.finish(frames, nbytes, deltas, time.perf_counter() - started)
@@ -0,0 +1,146 @@
+import os
+import struct
+import numpy as np
+
+# On-disk layout (little-endian):
+#   header       64 bytes, see HEADER_FORMAT
+#   matrix       n_rows x dim, float32 or float16, rows L2-normalized, 64-byte aligned
+#   offset table n_rows + 1 uint64 byte offsets into the text blob
+#   text blob    UTF-8 chunk texts, concatenated
+MAGIC = b"PNVSTORE"
+VERSION = 1
+HEADER_FORMAT = "<8sHHIQQQQQQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+ALIGNMENT = 64
+
+FLAG_NORMALIZED = 1
+
+DTYPE_CODES = {
+    "float32": 1,
+    "float16": 2
+}
+CODE_DTYPES = {code: np.dtype(name) for name, code in DTYPE_CODES.items()}
+
+VECTOR_STORE_EXTENSION = ".vec"
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def is_vector_store(path):
+    """Check whether path points to a file in the binary vector store format"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def write_vector_store(path, embeddings, chunks, dtype="float32"):
+    """Write embeddings and their chunk texts to path.
+
+    Rows are L2-normalized before writing. The file is written to a temporary
+    name and renamed into place so readers never map a half-written file.
+    """
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f"Unsupported dtype: {dtype}")
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[0] != len(chunks):
+        raise ValueError(f"Expected {len(chunks)} embeddings, got array of shape {matrix.shape}")
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix = (matrix / norms).astype(np.dtype(dtype).newbyteorder('<'))
+
+    encoded = [chunk.encode('utf-8') for chunk in chunks]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+    offsets[1:] = np.cumsum([len(text) for text in encoded])
+
+    n_rows, dim = matrix.shape
+    matrix_offset = _align(HEADER_SIZE)
+    offsets_offset = _align(matrix_offset + matrix.nbytes)
+    text_offset = offsets_offset + offsets.nbytes
+    text_size = int(offsets[-1])
+    header = struct.pack(
+        HEADER_FORMAT, MAGIC, VERSION, DTYPE_CODES[dtype], FLAG_NORMALIZED,
+        n_rows, dim, matrix_offset, offsets_offset, text_offset, text_size
+    )
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(b"\0" * (matrix_offset - HEADER_SIZE))
+        f.write(matrix.tobytes())
+        f.write(b"\0" * (offsets_offset - matrix_offset - matrix.nbytes))
+        f.write(offsets.tobytes())
+        for text in encoded:
+            f.write(text)
+    os.replace(tmp_path, path)
+    print(f"Vector store saved to {path} ({n_rows} x {dim}, {dtype})")
+
+
+class ChunkTable:
+    """Read-only sequence of chunk texts decoded lazily from the mapped text blob"""
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("chunk index out of range")
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._blob[start:end].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class VectorStore:
+    """Zero-copy view over a vector store file.
+
+    The matrix and text blob are np.memmap views, so every worker process
+    mapping the same file shares its pages through the OS page cache.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            raise ValueError(f"Truncated vector store: {path}")
+        (magic, version, dtype_code, flags, n_rows, dim,
+         matrix_offset, offsets_offset, text_offset, text_size) = struct.unpack(HEADER_FORMAT, header)
+        if magic != MAGIC:
+            raise ValueError(f"Not a vector store file: {path}")
+        if version > VERSION:
+            raise ValueError(f"Unsupported vector store version {version} in {path}")
+        if dtype_code not in CODE_DTYPES:
+            raise ValueError(f"Unknown dtype code {dtype_code} in {path}")
+
+        self.version = version
+        self.normalized = bool(flags & FLAG_NORMALIZED)
+        self.dtype = CODE_DTYPES[dtype_code].newbyteorder('<')
+        self.nbytes = os.path.getsize(path)
+        if n_rows:
+            self.matrix = np.memmap(path, dtype=self.dtype, mode='r', offset=matrix_offset, shape=(n_rows, dim))
+        else:
+            self.matrix = np.zeros((0, dim), dtype=self.dtype)
+        offsets = np.memmap(path, dtype='<u8', mode='r', offset=offsets_offset, shape=(n_rows + 1,))
+        blob = np.memmap(path, dtype=np.uint8, mode='r', offset=text_offset, shape=(text_size,)) if text_size else np.zeros(0, dtype=np.uint8)
+        self.chunks = ChunkTable(offsets, blob)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+
+def open_vector_store(path):
+    """Map a vector store file into memory"""
+    return VectorStore(path)
@@ -9,21 +9,36 @@ from .document import (
 
 from .page import (
     create_page,
+    create_pages,
     get_page_by_id,
     get_pages_by_document_id,
+    count_pages,
+    get_page_images,
     update_page,
     add_image_to_page,
     delete_page,
     delete_pages_by_document_id
 )
 
+from .image import (
+    create_image_refs,
+    get_image_ref,
+    get_image_refs_by_document_id,
+    get_document_image_map,
+    delete_image_refs_by_document_id
+)
+
 from .chatbot import (
     create_chatbot,
     get_chatbot_by_id,
+    get_chatbot_document_id,
     get_chatbots_by_document_id,
     add_history_item,
     get_chat_history,
+    get_chat_turns_between,
+    has_chat_turns_before,
     clear_chat_history,
+    update_history_summary,
     delete_chatbot
 )
 
@@ -38,19 +53,33 @@ __all__ = [
     
     # Page
     'create_page',
+    'create_pages',
     'get_page_by_id',
     'get_pages_by_document_id',
+    'count_pages',
+    'get_page_images',
     'update_page',
     'add_image_to_page',
     'delete_page',
     'delete_pages_by_document_id',
     
+    # Image
+    'create_image_refs',
+    'get_image_ref',
+    'get_image_refs_by_document_id',
+    'get_document_image_map',
+    'delete_image_refs_by_document_id',
+    
     # Chatbot
     'create_chatbot',
     'get_chatbot_by_id',
+    'get_chatbot_document_id',
     'get_chatbots_by_document_id',
     'add_history_item',
     'get_chat_history',
+    'get_chat_turns_between',
+    'has_chat_turns_before',
     'clear_chat_history',
+    'update_history_summary',
     'delete_chatbot'
 ]
\ No newline at end of file
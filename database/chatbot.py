@@ -11,6 +11,7 @@ logger = logging.getLogger(__name__)
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from collection_db.chatbot import Chatbot, HistoryItem, DocumentRef
+from collection_db.chat_turn import ChatTurn
 
 chatbot_collection = Chatbot
 
@@ -39,49 +40,114 @@ async def create_chatbot(
 async def get_chatbot_by_id(chatbot_id: str) -> Optional[Chatbot]:
     return await chatbot_collection.find_one({"chatbot_id": chatbot_id})
 
+async def get_chatbot_document_id(chatbot_id: str) -> Optional[str]:
+    """Document id of a chatbot without loading its history"""
+    raw = await chatbot_collection.get_motor_collection().find_one(
+        {"chatbot_id": chatbot_id},
+        {"document.id_document": 1, "_id": 0}
+    )
+    return raw["document"]["id_document"] if raw else None
+
 async def get_chatbots_by_document_id(document_id: str) -> List[Chatbot]:
     return await chatbot_collection.find({"document.id_document": document_id}).to_list()
 
-async def add_history_item(chatbot_id: str, question: str, answer: str) -> Optional[Chatbot]:
-    history_item = HistoryItem(
-        question=question,
-        answer=answer
+async def add_history_item(chatbot_id: str, question: str, answer: str) -> Optional[ChatTurn]:
+    """Append a turn to the chatbot's history; the chatbot document itself only gets a new updated_at"""
+    now = datetime.utcnow()
+    result = await chatbot_collection.get_motor_collection().update_one(
+        {"chatbot_id": chatbot_id},
+        {"$set": {"updated_at": now}}
     )
-    
-    update_query = {
-        "$push": {"history": history_item.dict()},
-        "$set": {"updated_at": datetime.utcnow()}
-    }
-    
-    chatbot = await chatbot_collection.find_one({"chatbot_id": chatbot_id})
-    if not chatbot:
+    if not result.matched_count:
         return None
-        
-    await chatbot.update(update_query)
-    return chatbot
+    
+    turn = ChatTurn(
+        chatbot_id=chatbot_id,
+        question=question,
+        answer=answer,
+        timestamp=now
+    )
+    return await ChatTurn.insert_one(turn)
 
-async def get_chat_history(chatbot_id: str) -> List[HistoryItem]:
-    chatbot = await chatbot_collection.find_one({"chatbot_id": chatbot_id})
-    return chatbot.history if chatbot else []
+async def get_chat_history(
+    chatbot_id: str,
+    limit: Optional[int] = None,
+    before: Optional[datetime] = None
+) -> List[ChatTurn]:
+    """Latest turns of a chatbot, oldest first; page backwards by passing the first timestamp as before"""
+    query = {"chatbot_id": chatbot_id}
+    if before is not None:
+        query["timestamp"] = {"$lt": before}
+    cursor = ChatTurn.find(query).sort([("timestamp", -1)])
+    if limit:
+        cursor = cursor.limit(limit)
+    turns = await cursor.to_list()
+    turns.reverse()
+    return turns
 
-async def clear_chat_history(chatbot_id: str) -> Optional[Chatbot]:
-    update_query = {
-        "$set": {
-            "history": [],
-            "updated_at": datetime.utcnow()
+async def get_chat_turns_between(
+    chatbot_id: str,
+    after: Optional[datetime],
+    until: datetime,
+    limit: int
+) -> List[ChatTurn]:
+    """Oldest turns with after < timestamp <= until, oldest first; after=None starts at the first turn"""
+    timestamp = {"$lte": until}
+    if after is not None:
+        timestamp["$gt"] = after
+    return await ChatTurn.find(
+        {"chatbot_id": chatbot_id, "timestamp": timestamp}
+    ).sort([("timestamp", 1)]).limit(limit).to_list()
+
+async def has_chat_turns_before(chatbot_id: str, before: datetime) -> bool:
+    """Whether a chatbot has any turn older than before, answered from the index"""
+    raw = await ChatTurn.get_motor_collection().find_one(
+        {"chatbot_id": chatbot_id, "timestamp": {"$lt": before}},
+        {"_id": 1}
+    )
+    return raw is not None
+
+async def clear_chat_history(chatbot_id: str) -> bool:
+    """Drop every turn and the rolling summary of a chatbot; returns whether the chatbot exists"""
+    result = await chatbot_collection.get_motor_collection().update_one(
+        {"chatbot_id": chatbot_id},
+        {
+            "$set": {
+                "history": [],
+                "history_summary": None,
+                "summary_until": None,
+                "updated_at": datetime.utcnow()
+            },
+            "$inc": {"history_generation": 1}
         }
-    }
-    
-    chatbot = await chatbot_collection.find_one({"chatbot_id": chatbot_id})
-    if not chatbot:
-        return None
-        
-    await chatbot.update(update_query)
-    return chatbot
+    )
+    if not result.matched_count:
+        return False
+    await ChatTurn.find({"chatbot_id": chatbot_id}).delete()
+    return True
+
+async def update_history_summary(
+    chatbot_id: str,
+    summary: str,
+    summary_until: datetime,
+    previous_until: Optional[datetime] = None,
+    generation: int = 0
+) -> bool:
+    """Store a new rolling summary unless another worker advanced it or the history was cleared first"""
+    result = await chatbot_collection.get_motor_collection().update_one(
+        {
+            "chatbot_id": chatbot_id,
+            "summary_until": previous_until,
+            # Chatbots stored before the counter existed have no field until their first clear
+            "history_generation": {"$in": [0, None]} if generation == 0 else generation
+        },
+        {"$set": {"history_summary": summary, "summary_until": summary_until}}
+    )
+    return result.modified_count == 1
 
 async def delete_chatbot(chatbot_id: str) -> bool:
-    chatbot = await chatbot_collection.find_one({"chatbot_id": chatbot_id})
-    if chatbot:
-        await chatbot.delete()
-        return True
-    return False 
\ No newline at end of file
+    result = await chatbot_collection.get_motor_collection().delete_one({"chatbot_id": chatbot_id})
+    if not result.deleted_count:
+        return False
+    await ChatTurn.find({"chatbot_id": chatbot_id}).delete()
+    return True
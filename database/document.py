@@ -3,6 +3,7 @@ from datetime import datetime
 import sys
 import os
 import logging
+from pymongo import ReturnDocument
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -46,14 +47,12 @@ async def update_document(document_id: str, update_data: dict) -> Optional[Docum
     update_data can include: link_document, documents_path, vector_path
     """
     update_data["updated_at"] = datetime.utcnow()
-    update_query = {"$set": update_data}
-    
-    document = await document_collection.find_one({"document_id": document_id})
-    if not document:
-        return None
-        
-    await document.update(update_query)
-    return document
+    raw = await document_collection.get_motor_collection().find_one_and_update(
+        {"document_id": document_id},
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
+    )
+    return DocumentModel.model_validate(raw) if raw else None
 
 async def delete_document(document_id: str) -> bool:
     document = await document_collection.find_one({"document_id": document_id})
@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional
+from collections import OrderedDict
+import sys
+import os
+import time
+import logging
+from pymongo.errors import BulkWriteError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collection_db.image import ImageRef
+from collection_db.page import Page, Image
+
+image_collection = ImageRef
+
+# Per-document {image_stem: ImageRef} maps kept in process. Writes through this
+# module invalidate them; the TTL bounds staleness across worker processes.
+IMAGE_MAP_CACHE_SIZE = int(os.getenv("IMAGE_MAP_CACHE_SIZE", "256"))
+IMAGE_MAP_TTL = float(os.getenv("IMAGE_MAP_TTL", "300"))
+_image_maps = OrderedDict()
+
+def image_stem(image_id: str) -> str:
+    """Image id without its file extension, matching both img-2 and img-2.jpeg"""
+    return image_id.split('.')[0]
+
+def image_refs_for_page(document_id: str, page_id: str, page_number: int, images: List[Image]) -> List[ImageRef]:
+    """Build index entries for the blob-backed images of one page"""
+    return [
+        ImageRef(
+            document_id=document_id,
+            image_id=img.id,
+            image_stem=image_stem(img.id),
+            page_id=page_id,
+            page_number=page_number,
+            hash=img.hash,
+            size=img.size or 0,
+            mime=img.mime or "application/octet-stream"
+        )
+        for img in images
+        if img.hash
+    ]
+
+def image_refs_for_pages(pages: List[Page]) -> List[ImageRef]:
+    """Build index entries for every blob-backed image of the given pages"""
+    return [
+        ref
+        for page in pages
+        for ref in image_refs_for_page(page.document_id, page.page_id, page.page_number, page.images)
+    ]
+
+async def create_image_refs(refs: List[ImageRef]) -> int:
+    if not refs:
+        return 0
+    for document_id in {ref.document_id for ref in refs}:
+        invalidate_document_image_map(document_id)
+    try:
+        result = await image_collection.insert_many(refs, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        logger.error(f"Failed to index {len(e.details.get('writeErrors', []))} images")
+        return e.details.get("nInserted", 0)
+
+async def get_image_ref(document_id: str, image_id: str) -> Optional[ImageRef]:
+    """Find an image by id, with or without extension; the first page wins on duplicates"""
+    return await image_collection.find_one(
+        {"document_id": document_id, "image_stem": image_stem(image_id)},
+        sort=[("page_number", 1)]
+    )
+
+async def get_image_refs_by_document_id(document_id: str) -> List[ImageRef]:
+    return await image_collection.find({"document_id": document_id}).sort("page_number").to_list()
+
+async def delete_image_refs_by_document_id(document_id: str) -> int:
+    invalidate_document_image_map(document_id)
+    result = await image_collection.find({"document_id": document_id}).delete()
+    return result.deleted_count if result else 0
+
+async def replace_page_image_refs(document_id: str, page_id: str, page_number: int, images: List[Image]) -> int:
+    """Re-index the images of a single page after its images changed"""
+    await delete_image_refs_by_page_id(document_id, page_id)
+    return await create_image_refs(image_refs_for_page(document_id, page_id, page_number, images))
+
+async def delete_image_refs_by_page_id(document_id: str, page_id: str) -> int:
+    invalidate_document_image_map(document_id)
+    result = await image_collection.find({"page_id": page_id}).delete()
+    return result.deleted_count if result else 0
+
+async def get_document_image_map(document_id: str) -> Dict[str, ImageRef]:
+    """Map image stems to their index entries, cached per document"""
+    entry = _image_maps.get(document_id)
+    if entry is not None and time.monotonic() - entry[0] < IMAGE_MAP_TTL:
+        _image_maps.move_to_end(document_id)
+        return entry[1]
+
+    image_map = {}
+    for ref in await get_image_refs_by_document_id(document_id):
+        # First page wins, matching get_image_ref
+        image_map.setdefault(ref.image_stem, ref)
+
+    _image_maps[document_id] = (time.monotonic(), image_map)
+    _image_maps.move_to_end(document_id)
+    while len(_image_maps) > IMAGE_MAP_CACHE_SIZE:
+        _image_maps.popitem(last=False)
+    return image_map
+
+def invalidate_document_image_map(document_id: str) -> None:
+    _image_maps.pop(document_id, None)
@@ -0,0 +1,87 @@
+from typing import List
+import sys
+import os
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collection_db.document import DocumentModel
+from collection_db.page import Page
+from collection_db.chatbot import Chatbot
+from collection_db.job import IngestJob
+from collection_db.image import ImageRef
+from collection_db.chat_turn import ChatTurn
+
+INDEX_AUDIT_ENABLED = os.getenv("INDEX_AUDIT_ENABLED", "true").lower() == "true"
+
+# Plan stages that mean a query is not served by an index
+UNINDEXED_STAGES = {
+    "COLLSCAN": "collection scan",
+    "SORT": "in-memory sort"
+}
+
+# (model, name, filter, sort) of the queries issued on every request or ingest;
+# the filter values only need the right shape, the plan does not depend on them
+HOT_QUERIES = [
+    (DocumentModel, "document by id", {"document_id": ""}, None),
+    (Page, "pages of a document", {"document_id": ""}, [("page_number", 1)]),
+    (Page, "page by id", {"page_id": ""}, None),
+    (Page, "page images of a document", {"document_id": "", "images.0": {"$exists": True}}, [("page_number", 1)]),
+    (ImageRef, "image by reference", {"document_id": "", "image_stem": ""}, [("page_number", 1)]),
+    (ImageRef, "images of a document", {"document_id": ""}, [("page_number", 1)]),
+    (ImageRef, "images of a page", {"page_id": ""}, None),
+    (Chatbot, "chatbot by id", {"chatbot_id": ""}, None),
+    (ChatTurn, "latest turns of a chatbot", {"chatbot_id": ""}, [("timestamp", -1)]),
+    (IngestJob, "next queued job", {"status": "queued"}, [("created_at", 1)]),
+    (IngestJob, "job by id", {"job_id": ""}, None)
+]
+
+
+def plan_stages(plan) -> List[str]:
+    """Every stage name in an explain plan, including nested and per-shard stages"""
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in plan_stages(item)]
+    if not isinstance(plan, dict):
+        return []
+    stages = [plan["stage"]] if isinstance(plan.get("stage"), str) else []
+    for value in plan.values():
+        if isinstance(value, (dict, list)):
+            stages.extend(plan_stages(value))
+    return stages
+
+
+async def explain_query(model, query: dict, sort=None) -> List[str]:
+    cursor = model.get_motor_collection().find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    explain = await cursor.explain()
+    return plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+
+
+async def audit_indexes() -> List[str]:
+    """Explain the hot queries and log every one that scans a collection or sorts in memory.
+
+    Returns the warnings, so callers and scripts can act on them; an empty
+    list means every hot query is served by an index.
+    """
+    if not INDEX_AUDIT_ENABLED:
+        return []
+    warnings = []
+    for model, name, query, sort in HOT_QUERIES:
+        collection = model.get_motor_collection().name
+        try:
+            stages = await explain_query(model, query, sort)
+        except Exception as e:
+            logger.warning(f"Index audit could not explain {name} on {collection}: {str(e)}")
+            continue
+        problems = [UNINDEXED_STAGES[stage] for stage in dict.fromkeys(stages) if stage in UNINDEXED_STAGES]
+        if problems:
+            warning = f"Index audit: {name} on {collection} uses {' and '.join(problems)} ({' > '.join(stages)})"
+            logger.warning(warning)
+            warnings.append(warning)
+    logger.info(f"Index audit checked {len(HOT_QUERIES)} queries, {len(warnings)} not served by an index")
+    return warnings
@@ -0,0 +1,89 @@
+from typing import List, Optional
+from datetime import datetime, timedelta
+import sys
+import os
+import logging
+from pymongo import ReturnDocument
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collection_db.job import IngestJob, JobStage
+
+job_collection = IngestJob
+
+async def create_job(job_id: str, document_id: str, pdf_url: str, stages: List[str]) -> Optional[IngestJob]:
+    try:
+        logger.info(f"Creating ingest job {job_id} for document {document_id}")
+        job = IngestJob(
+            job_id=job_id,
+            document_id=document_id,
+            pdf_url=pdf_url,
+            stages=[JobStage(name=stage) for stage in stages]
+        )
+        return await job_collection.create(job)
+    except Exception as e:
+        logger.error(f"Error creating ingest job: {str(e)}", exc_info=True)
+        return None
+
+async def get_job_by_id(job_id: str) -> Optional[IngestJob]:
+    return await job_collection.find_one({"job_id": job_id})
+
+async def claim_next_job() -> Optional[IngestJob]:
+    """Atomically move the oldest queued job to running and return it"""
+    now = datetime.utcnow()
+    raw = await job_collection.get_motor_collection().find_one_and_update(
+        {"status": "queued"},
+        {
+            "$set": {"status": "running", "started_at": now, "updated_at": now},
+            "$inc": {"attempts": 1}
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+    return IngestJob.model_validate(raw) if raw else None
+
+async def update_job_stage(job_id: str, stage: str, status: str, detail: str = None) -> None:
+    now = datetime.utcnow()
+    update = {
+        "stages.$.status": status,
+        "updated_at": now
+    }
+    if detail is not None:
+        update["stages.$.detail"] = detail
+    if status == "running":
+        update["stages.$.started_at"] = now
+    elif status in ("done", "failed"):
+        update["stages.$.finished_at"] = now
+    await job_collection.get_motor_collection().update_one(
+        {"job_id": job_id, "stages.name": stage},
+        {"$set": update}
+    )
+
+async def finish_job(job_id: str, status: str, error: str = None) -> None:
+    now = datetime.utcnow()
+    await job_collection.get_motor_collection().update_one(
+        {"job_id": job_id},
+        {"$set": {"status": status, "error": error, "finished_at": now, "updated_at": now}}
+    )
+
+async def requeue_stale_jobs(stale_after: timedelta) -> int:
+    """Put running jobs that stopped reporting progress back on the queue, e.g. after a restart"""
+    result = await job_collection.get_motor_collection().update_many(
+        {"status": "running", "updated_at": {"$lt": datetime.utcnow() - stale_after}},
+        {"$set": {
+            "status": "queued",
+            "updated_at": datetime.utcnow(),
+            # Stages run again from the start, so their old progress no longer applies
+            "stages.$[].status": "pending",
+            "stages.$[].detail": None,
+            "stages.$[].started_at": None,
+            "stages.$[].finished_at": None
+        }}
+    )
+    if result.modified_count:
+        logger.info(f"Requeued {result.modified_count} stale ingest jobs")
+    return result.modified_count
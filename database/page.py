@@ -1,5 +1,6 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime
+from pymongo.errors import BulkWriteError
 import sys
 import os
 import logging
@@ -11,10 +12,19 @@ logger = logging.getLogger(__name__)
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from collection_db.page import Page, Image
-
+from database.image import (
+    image_refs_for_page,
+    create_image_refs,
+    replace_page_image_refs,
+    delete_image_refs_by_page_id,
+    delete_image_refs_by_document_id
+)
 
 page_collection = Page
 
+# Pages sent per insert_many round-trip
+PAGE_INSERT_BATCH_SIZE = int(os.getenv("PAGE_INSERT_BATCH_SIZE", "50"))
+
 async def create_page(
     document_id: str,
     page_id: str,
@@ -41,54 +51,119 @@ async def create_page(
         logger.error(f"Error creating page: {str(e)}", exc_info=True)
         return None
 
+async def create_pages(pages: List[Page], batch_size: int = PAGE_INSERT_BATCH_SIZE) -> Tuple[int, List[str]]:
+    """
+    Insert pages with unordered insert_many in batches of batch_size.
+    Returns the number of inserted pages and the page_ids that failed to insert.
+    """
+    inserted = 0
+    failed_page_ids = []
+    for start in range(0, len(pages), batch_size):
+        batch = pages[start:start + batch_size]
+        try:
+            result = await page_collection.insert_many(batch, ordered=False)
+            inserted += len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Unordered inserts keep going past failures; collect the pages that were rejected
+            write_errors = e.details.get("writeErrors", [])
+            inserted += e.details.get("nInserted", len(batch) - len(write_errors))
+            for error in write_errors:
+                failed_page_ids.append(batch[error["index"]].page_id)
+                logger.error(f"Failed to insert page {batch[error['index']].page_id}: {error.get('errmsg')}")
+        except Exception as e:
+            logger.error(f"Error inserting pages {start}-{start + len(batch) - 1}: {str(e)}", exc_info=True)
+            failed_page_ids.extend(page.page_id for page in batch)
+    logger.info(f"Inserted {inserted}/{len(pages)} pages in {(len(pages) + batch_size - 1) // batch_size} batches")
+    return inserted, failed_page_ids
+
 async def get_page_by_id(page_id: str) -> Optional[Page]:
     return await page_collection.find_one({"page_id": page_id})
 
 async def get_pages_by_document_id(document_id: str) -> List[Page]:
     return await page_collection.find({"document_id": document_id}).sort("page_number").to_list()
 
+async def count_pages(document_id: str, limit: Optional[int] = None) -> int:
+    """Number of pages of a document, counted on the index; limit=1 is the cheapest existence check"""
+    options = {"limit": limit} if limit else {}
+    return await page_collection.get_motor_collection().count_documents({"document_id": document_id}, **options)
+
+async def get_page_images(document_id: str, image_ids: List[str]) -> List[Image]:
+    """Fetch only the images with the given ids (with or without extension), in page order"""
+    stems = list({image_id.split('.')[0] for image_id in image_ids})
+    if not stems:
+        return []
+    image_stem = {"$arrayElemAt": [{"$split": ["$$img.id", "."]}, 0]}
+    pipeline = [
+        {"$match": {"document_id": document_id, "images.0": {"$exists": True}}},
+        {"$sort": {"page_number": 1}},
+        {"$project": {
+            "_id": 0,
+            "images": {"$filter": {"input": "$images", "as": "img", "cond": {"$in": [image_stem, stems]}}}
+        }},
+        {"$unwind": "$images"}
+    ]
+    cursor = page_collection.get_motor_collection().aggregate(pipeline)
+    return [Image.model_validate(row["images"]) async for row in cursor]
+
 async def get_all_pages() -> List[Page]:
     return await page_collection.find_all().to_list()
 
+# Fields returned by page writes: enough to re-index images, never the markdown or image payloads
+PAGE_REF_PROJECTION = {"_id": 0, "document_id": 1, "page_number": 1}
+
 async def update_page(
     page_id: str,
     markdown: str = None,
     images: List[Image] = None
-) -> Optional[Page]:
+) -> bool:
+    """Update a page in a single round-trip; returns whether the page exists"""
     update_query = {"$set": {"updated_at": datetime.utcnow()}}
     
     if markdown is not None:
         update_query["$set"]["markdown"] = markdown
     if images is not None:
-        update_query["$set"]["images"] = images
+        update_query["$set"]["images"] = [img.model_dump(exclude_none=True) for img in images]
     
-    page = await page_collection.find_one({"page_id": page_id})
-    if not page:
-        return None
-        
-    await page.update(update_query)
-    return page
+    raw = await page_collection.get_motor_collection().find_one_and_update(
+        {"page_id": page_id},
+        update_query,
+        projection=PAGE_REF_PROJECTION
+    )
+    if not raw:
+        return False
+    if images is not None:
+        await replace_page_image_refs(raw["document_id"], page_id, raw["page_number"], images)
+    return True
 
-async def add_image_to_page(page_id: str, image: Image) -> Optional[Page]:
+async def add_image_to_page(page_id: str, image: Image) -> bool:
+    """Append an image to a page in a single round-trip; returns whether the page exists"""
     update_query = {
-        "$push": {"images": image.dict()},
+        "$push": {"images": image.model_dump(exclude_none=True)},
         "$set": {"updated_at": datetime.utcnow()}
     }
     
-    page = await page_collection.find_one({"page_id": page_id})
-    if not page:
-        return None
-        
-    await page.update(update_query)
-    return page
+    raw = await page_collection.get_motor_collection().find_one_and_update(
+        {"page_id": page_id},
+        update_query,
+        projection=PAGE_REF_PROJECTION
+    )
+    if not raw:
+        return False
+    # The page's other images are indexed already; only the new one needs an entry
+    await create_image_refs(image_refs_for_page(raw["document_id"], page_id, raw["page_number"], [image]))
+    return True
 
 async def delete_page(page_id: str) -> bool:
-    page = await page_collection.find_one({"page_id": page_id})
-    if page:
-        await page.delete()
-        return True
-    return False
+    raw = await page_collection.get_motor_collection().find_one_and_delete(
+        {"page_id": page_id},
+        projection={"_id": 0, "document_id": 1}
+    )
+    if not raw:
+        return False
+    await delete_image_refs_by_page_id(raw["document_id"], page_id)
+    return True
 
 async def delete_pages_by_document_id(document_id: str) -> int:
+    await delete_image_refs_by_document_id(document_id)
     result = await page_collection.find({"document_id": document_id}).delete()
     return result.deleted_count 
\ No newline at end of file
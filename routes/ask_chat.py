@@ -1,23 +1,29 @@
-from fastapi import HTTPException, APIRouter
+from fastapi import HTTPException, APIRouter, Request, Response
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 from fastapi.responses import HTMLResponse, StreamingResponse
 import os
-import json
 import re
+import hashlib
+from urllib.parse import quote
 from core.chat import chat, chat_stream, chat_streamv2
+from core.streaming import StreamEvent, sse_stream
+from core.answer_cache import ANSWER_CACHE_ENABLED, answer_cache, replay_answer
+from core.retrieve import aembed_queries
+from core.history import assemble_history
 from cohere import ChatbotMessage, UserMessage
-import asyncio
-from constants.LLM_models import ModelName, MODELS, Provider
-import google.generativeai as genai
+from constants.LLM_models import ModelName
 import sys
 import logging
 
 # Add the project root directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.chatbot import get_chatbot_by_id, add_history_item
-from database.page import get_pages_by_document_id
+from database.chatbot import get_chatbot_by_id, get_chatbot_document_id, add_history_item
+from database.page import get_page_images
+from database.image import get_document_image_map
+from commons.blob_store import get_blob_store, aimage_data_uri, aread_image, to_data_uri
+from core.image_cache import aget_image_bytes
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -27,11 +33,14 @@ class ChatStreamRequest(BaseModel):
     query: str
     model_name: str
     chatbot_id: str
+    # "inline" embeds image_b64 in the done event, "url" sends cacheable image URLs
+    image_mode: Literal["inline", "url"] = "inline"
 
 class ChatMessage(BaseModel):
     query: str
     model_name: str
     chatbot_id: str
+    image_mode: Literal["inline", "url"] = "inline"
 
 class ChatResponse(BaseModel):
     answer: str
@@ -52,393 +61,307 @@ def get_model_enum(model_name: str) -> ModelName:
                 return member
         raise ValueError(f"Invalid model name: {model_name}")
 
-@router.post("/chat-stream")
-async def chat_stream_endpoint(chat_request: ChatStreamRequest):
+def resolve_model_key(model_name: str) -> str:
+    """"default" for the Cohere chat, otherwise the ModelName member name; raises 400 for unknown models"""
+    if not model_name or model_name == "default":
+        return "default"
     try:
-        # Get chatbot from database
-        chatbot = await get_chatbot_by_id(chat_request.chatbot_id)
-        if not chatbot:
-            raise HTTPException(status_code=404, detail="Chatbot not found")
-            
-        # Get chat history from chatbot
-        formatted_history = []
-        if chatbot.history:
-            for item in chatbot.history:
-                formatted_history.append({"role": "user", "content": item.question})
-                formatted_history.append({"role": "assistant", "content": item.answer})
+        return get_model_enum(model_name).name
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        if not chat_request.model_name or chat_request.model_name == "default":
-            async def generate():
-                answer = ""  # Track the complete answer
-                stream = chat_stream(
-                    query=chat_request.query,
-                    chat_history=formatted_history
-                )
-                
-                for event in stream:
-                    if event.type == "content-delta":
-                        answer += event.delta.message.content.text
-                        yield f"data: {json.dumps({'text': event.delta.message.content.text})}\n\n"
-                        await asyncio.sleep(0.02)
-                    
-                    elif event.type == "message-end":
-                        # Extract images from the answer
-                        try:
-                            images = await extract_images_from_text(answer, chatbot.document.id_document)
-                        except Exception as e:
-                            logger.error(f"Error extracting images: {str(e)}")
-                            images = []
+async def lookup_answer(document_id: str, model_key: str, query: str, chat_history: list):
+    """Look the query up in the semantic answer cache.
 
-                        # Save chat history before ending
-                        try:
-                            await add_history_item(
-                                chatbot_id=chat_request.chatbot_id,
-                                question=chat_request.query,
-                                answer=answer
-                            )
-                        except Exception as e:
-                            logger.error(f"Error saving chat history: {str(e)}")
-                            
-                        yield f"data: {json.dumps({'done': True, 'answer': answer, 'images': images})}\n\n"
-                        break
-                
-            return StreamingResponse(generate(), media_type="text/event-stream")
-        else:
-            async def generate():
-                answer = ""  # Track the complete answer
-                try:
-                    # Convert model name to enum
-                    model_enum = get_model_enum(chat_request.model_name)
-                    
-                    # Get response generator
-                    response_generator = chat_streamv2(
-                        query=chat_request.query,
-                        document_id=chatbot.document.id_document,
-                        chat_history=formatted_history,
-                        model_name=model_enum.name
-                    )
-                    
-                    # Get provider type
-                    provider = MODELS[model_enum]["provider"]
-                    
-                    if provider == Provider.ANTHROPIC:
-                        async for chunk in response_generator:
-                            # Parse the JSON string from chat.py
-                            if chunk:
-                                try:
-                                    data = json.loads(chunk)
-                                    
-                                    # Handle thinking events for CLAUDE_3_7_SONNET
-                                    if data.get("type") == "text_delta" and data.get("text"):
-                                        answer += data.get("text")
-                                        yield f"data: {json.dumps({'text': data.get('text')})}\n\n"
-                                    elif data.get("type") == "content_block_start":
-                                        yield f"data: {json.dumps({'type': 'block_start', 'block_type': data.get('block_type')})}\n\n"
-                                    elif data.get("type") == "content_block_stop":
-                                        yield f"data: {json.dumps({'type': 'block_stop'})}\n\n"
-                                    # Handle simple text streaming for other Claude models
-                                    elif data.get("type") == "content_block_delta" and data.get("text"):
-                                        answer += data.get("text")
-                                        yield f"data: {json.dumps({'text': data.get('text')})}\n\n"
-                                    elif data.get("type") == "error":
-                                        yield f"data: {json.dumps({'error': data.get('error')})}\n\n"
-                                except json.JSONDecodeError:
-                                    # If not JSON, handle as raw text
-                                    answer += chunk
-                                    yield f"data: {json.dumps({'text': chunk})}\n\n"
-                                await asyncio.sleep(0.02)
-                    
-                    elif provider == Provider.GOOGLE:
-                        try:
-                            model = genai.GenerativeModel(model_enum.value)
-                            response = model.generate_content(
-                                chat_request.query,
-                                stream=True
-                            )
-                            
-                            for chunk in response:
-                                try:
-                                    # Check if chunk has text directly
-                                    if hasattr(chunk, 'text') and chunk.text:
-                                        answer += chunk.text
-                                        yield f"data: {json.dumps({'text': chunk.text})}\n\n"
-                                    # Check if chunk has candidates
-                                    elif hasattr(chunk, 'candidates') and chunk.candidates:
-                                        for candidate in chunk.candidates:
-                                            # Check if candidate has content with text
-                                            if hasattr(candidate, 'content') and candidate.content:
-                                                if hasattr(candidate.content, 'parts') and candidate.content.parts:
-                                                    for part in candidate.content.parts:
-                                                        if hasattr(part, 'text') and part.text:
-                                                            answer += part.text
-                                                            yield f"data: {json.dumps({'text': part.text})}\n\n"
-                                                elif hasattr(candidate.content, 'text') and candidate.content.text:
-                                                    answer += candidate.content.text
-                                                    yield f"data: {json.dumps({'text': candidate.content.text})}\n\n"
-                                    # Check if chunk has finish_reason
-                                    elif hasattr(chunk, 'finish_reason'):
-                                        if chunk.finish_reason == 1:  # SAFETY
-                                            yield f"data: {json.dumps({'error': 'Content was blocked for safety reasons.'})}\n\n"
-                                        elif chunk.finish_reason == 2:  # RECITATION
-                                            yield f"data: {json.dumps({'error': 'Content was blocked for recitation reasons.'})}\n\n"
-                                        elif chunk.finish_reason == 3:  # OTHER
-                                            yield f"data: {json.dumps({'error': 'Content generation was stopped for other reasons.'})}\n\n"
-                                except Exception as chunk_error:
-                                    print(f"Error processing Gemini chunk: {str(chunk_error)}")
-                                    # Continue to next chunk instead of breaking the stream
-                                
-                                await asyncio.sleep(0.02)
-                            
-                            # Extract images and save chat history before ending
-                            try:
-                                images = await extract_images_from_text(answer, chatbot.document.id_document)
-                                await add_history_item(
-                                    chatbot_id=chat_request.chatbot_id,
-                                    question=chat_request.query,
-                                    answer=answer
-                                )
-                                yield f"data: {json.dumps({'done': True, 'answer': answer, 'images': images})}\n\n"
-                            except Exception as e:
-                                logger.error(f"Error in post-processing: {str(e)}")
-                                yield f"data: {json.dumps({'error': f'Error in post-processing: {str(e)}'})}\n\n"
-                            
-                        except Exception as e:
-                            error_msg = str(e)
-                            print(f"Error in Gemini stream: {error_msg}")
-                            yield f"data: {json.dumps({'error': error_msg})}\n\n"
-                    
-                    elif provider == Provider.OPENAI:
-                        try:
-                            print(f"Debug - Response type: {type(response)}")
-                            
-                            for chunk in response:
-                                try:
-                                    if chunk:
-                                        data = json.loads(chunk)
-                                        
-                                        if data.get("type") == "text_delta" and data.get("text"):
-                                            answer += data.get("text")
-                                            print(f"Debug - Content received: {data.get('text')}")
-                                            yield f"data: {json.dumps({'text': data.get('text')})}\n\n"
-                                        elif data.get("type") == "finish":
-                                            print(f"Debug - Finish reason: {data.get('reason')}")
-                                            if data.get("reason") == "stop":
-                                                # Extract images and save chat history before ending
-                                                try:
-                                                    images = await extract_images_from_text(answer, chatbot.document.id_document)
-                                                    await add_history_item(
-                                                        chatbot_id=chat_request.chatbot_id,
-                                                        question=chat_request.query,
-                                                        answer=answer
-                                                    )
-                                                    yield f"data: {json.dumps({'done': True, 'answer': answer, 'images': images})}\n\n"
-                                                except Exception as e:
-                                                    logger.error(f"Error in post-processing: {str(e)}")
-                                                    yield f"data: {json.dumps({'error': f'Error in post-processing: {str(e)}'})}\n\n"
-                                            else:
-                                                yield f"data: {json.dumps({'info': 'Stream ended: ' + str(data.get('reason'))})}\n\n"
-                                        elif data.get("type") == "error":
-                                            print(f"Error from OpenAI: {data.get('error')}")
-                                            yield f"data: {json.dumps({'error': data.get('error')})}\n\n"
-                                    
-                                    await asyncio.sleep(0.02)
-                                    
-                                except Exception as chunk_error:
-                                    print(f"Error processing chunk: {str(chunk_error)}")
-                                    print(f"Chunk data: {chunk}")
-                                    yield f"data: {json.dumps({'error': f'Error processing chunk: {str(chunk_error)}'})}\n\n"
-                        
-                        except Exception as e:
-                            error_msg = str(e)
-                            print(f"Error in OpenAI stream: {error_msg}")
-                            yield f"data: {json.dumps({'error': error_msg})}\n\n"
-                    
-                    # Extract images and save chat history before ending (if not already saved)
-                    if answer and provider != Provider.OPENAI and provider != Provider.GOOGLE:  # These providers already handle this
-                        try:
-                            images = await extract_images_from_text(answer, chatbot.document.id_document)
-                            await add_history_item(
-                                chatbot_id=chat_request.chatbot_id,
-                                question=chat_request.query,
-                                answer=answer
-                            )
-                            yield f"data: {json.dumps({'done': True, 'answer': answer, 'images': images})}\n\n"
-                        except Exception as e:
-                            logger.error(f"Error in post-processing: {str(e)}")
-                            yield f"data: {json.dumps({'error': f'Error in post-processing: {str(e)}'})}\n\n"
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    print(f"Error in generate: {error_msg}")
-                    yield f"data: {json.dumps({'error': error_msg})}\n\n"
-                    
-            return StreamingResponse(generate(), media_type="text/event-stream")
-            
+    None when the cache is disabled or the conversation already has history:
+    cached answers are keyed on the query alone, so follow-ups that depend
+    on earlier turns are neither served from nor stored in the cache.
+    """
+    if not ANSWER_CACHE_ENABLED or chat_history:
+        return None
+    return await answer_cache.lookup(document_id, model_key, query, embed=aembed_queries)
+
+async def answer_events(events, chat_request, document_id: str, cached_query=None):
+    """Forward provider events and end every stream with exactly one done or error event.
+    
+    The done event carries the full answer and its images, and is only sent
+    after the exchange has been saved to the chat history. Freshly generated
+    answers are stored in the answer cache under cached_query.
+    """
+    answer = ""
+    try:
+        async for event in events:
+            if event.type == "text":
+                answer += event.text
+            elif event.type == "thinking":
+                # Model reasoning is not part of the answer
+                continue
+            elif event.type == "error":
+                logger.error(f"Error from chat stream: {event.text}")
+                yield event
+                return
+            yield event
+    except Exception as e:
+        logger.error(f"Error in chat stream: {str(e)}", exc_info=True)
+        yield StreamEvent.error(str(e))
+        return
+    
+    if not answer:
+        logger.error("No answer generated from chat stream")
+        yield StreamEvent.error("No response generated")
+        return
+    
+    try:
+        # Extract images from the answer
+        images = await extract_images_from_text(answer, document_id, chat_request.chatbot_id, chat_request.image_mode)
+        
+        # Save chat history
+        await add_history_item(
+            chatbot_id=chat_request.chatbot_id,
+            question=chat_request.query,
+            answer=answer
+        )
+        if cached_query is not None and cached_query.answer is None:
+            answer_cache.put(cached_query, answer)
+        yield StreamEvent.done(answer, images)
+    except Exception as e:
+        logger.error(f"Error in post-processing: {str(e)}")
+        yield StreamEvent.error(f"Error in post-processing: {str(e)}")
+
+def stream_answer(events, chat_request, document_id: str, cached_query=None) -> StreamingResponse:
+    """Provider events -> done/error contract -> early image events -> SSE frames"""
+    events = answer_events(events, chat_request, document_id, cached_query)
+    return StreamingResponse(
+        sse_stream(stream_with_images(events, document_id, chat_request)),
+        media_type="text/event-stream"
+    )
+
+async def answer_chat(chat_request) -> StreamingResponse:
+    """Shared body of the streaming chat endpoints"""
+    # Get chatbot from database
+    chatbot = await get_chatbot_by_id(chat_request.chatbot_id)
+    if not chatbot:
+        raise HTTPException(status_code=404, detail="Chatbot not found")
+    document_id = chatbot.document.id_document
+    model_key = resolve_model_key(chat_request.model_name)
+    chat_history = await assemble_history(chatbot, model_key)
+    
+    # Repeated questions are replayed from the answer cache
+    cached_query = await lookup_answer(document_id, model_key, chat_request.query, chat_history)
+    if cached_query and cached_query.answer:
+        return stream_answer(replay_answer(cached_query.answer), chat_request, document_id, cached_query)
+    
+    if model_key == "default":
+        events = chat_stream(
+            query=chat_request.query,
+            document_id=document_id,
+            chat_history=chat_history
+        )
+    else:
+        events = chat_streamv2(
+            query=chat_request.query,
+            document_id=document_id,
+            chat_history=chat_history,
+            model_name=model_key
+        )
+    return stream_answer(events, chat_request, document_id, cached_query)
+
+@router.post("/chat-stream")
+async def chat_stream_endpoint(chat_request: ChatStreamRequest):
+    try:
+        return await answer_chat(chat_request)
+    except HTTPException:
+        raise
     except Exception as e:
         error_msg = str(e)
-        print(f"Error in chat_stream_endpoint: {error_msg}")
+        logger.error(f"Error in chat_stream_endpoint: {error_msg}")
         raise HTTPException(status_code=500, detail=error_msg)
 
 @router.post("/chat-streamv2", response_model=ChatResponse)
 async def chat_stream_v2_endpoint(chat_request: ChatMessage):
     try:
-        # Get chatbot from database
-        chatbot = await get_chatbot_by_id(chat_request.chatbot_id)
-        if not chatbot:
-            raise HTTPException(status_code=404, detail="Chatbot not found")
-            
-        # Get chat history from chatbot
-        formatted_history = []
-        if chatbot.history:  # Add null check
-            for item in chatbot.history:
-                formatted_history.append({"role": "user", "content": item.question})
-                formatted_history.append({"role": "assistant", "content": item.answer})
-
-        # Initialize response variables
-        answer = ""
-        
-        async def generate():
-            nonlocal answer
-            try:
-                # Get response generator
-                response_generator = chat_streamv2(
-                    query=chat_request.query,
-                    document_id=chatbot.document.id_document,
-                    chat_history=formatted_history,
-                    model_name=chat_request.model_name
-                )
-                
-                if response_generator is None:
-                    logger.error("Chat stream returned None")
-                    yield f"data: {json.dumps({'error': 'Chat stream initialization failed'})}\n\n"
-                    return
-
-                async for chunk in response_generator:
-                    if chunk:
-                        try:
-                            data = json.loads(chunk)
-                            
-                            if data.get("type") == "text_delta" and data.get("text"):
-                                answer += data.get("text")
-                                yield f"data: {json.dumps({'text': data.get('text')})}\n\n"
-                            elif data.get("type") == "content_block_start":
-                                yield f"data: {json.dumps({'type': 'block_start', 'block_type': data.get('block_type')})}\n\n"
-                            elif data.get("type") == "content_block_stop":
-                                yield f"data: {json.dumps({'type': 'block_stop'})}\n\n"
-                            elif data.get("type") == "content_block_delta" and data.get("text"):
-                                answer += data.get("text")
-                                yield f"data: {json.dumps({'text': data.get('text')})}\n\n"
-                            elif data.get("type") == "error":
-                                logger.error(f"Error from chat stream: {data.get('error')}")
-                                yield f"data: {json.dumps({'error': data.get('error')})}\n\n"
-                                return
-                        except json.JSONDecodeError:
-                            answer += chunk
-                            yield f"data: {json.dumps({'text': chunk})}\n\n"
-                        await asyncio.sleep(0.02)
-                
-                if answer:
-                    try:
-                        # Extract images from the answer
-                        images = await extract_images_from_text(answer, chatbot.document.id_document)
-                        
-                        # Save chat history
-                        await add_history_item(
-                            chatbot_id=chat_request.chatbot_id,
-                            question=chat_request.query,
-                            answer=answer
-                        )
-                        
-                        # Return final response
-                        yield f"data: {json.dumps({'done': True, 'answer': answer, 'images': images})}\n\n"
-                    except Exception as e:
-                        logger.error(f"Error in post-processing: {str(e)}")
-                        yield f"data: {json.dumps({'error': f'Error in post-processing: {str(e)}'})}\n\n"
-                else:
-                    logger.error("No answer generated from chat stream")
-                    yield f"data: {json.dumps({'error': 'No response generated'})}\n\n"
-                
-            except Exception as e:
-                error_msg = str(e)
-                logger.error(f"Error in generate: {error_msg}")
-                yield f"data: {json.dumps({'error': error_msg})}\n\n"
-            
-        return StreamingResponse(generate(), media_type="text/event-stream")
-        
+        return await answer_chat(chat_request)
+    except HTTPException:
+        raise
     except Exception as e:
         error_msg = str(e)
         logger.error(f"Error in chat_stream_endpoint: {error_msg}")
         raise HTTPException(status_code=500, detail=error_msg)
 
+# Browsers revalidate with the content-hash ETag once max-age expires
+IMAGE_CACHE_CONTROL = "private, max-age=86400"
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check with weak comparison: "*", tag lists and W/ tags all match"""
+    if not if_none_match:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in tags or etag in {tag[2:] if tag.startswith("W/") else tag for tag in tags}
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL})
+
 @router.get("/image/{chatbot_id}/{image_id}")
-async def get_image(chatbot_id: str, image_id: str):
+async def get_image(chatbot_id: str, image_id: str, request: Request):
+    """Serve raw image bytes with an ETag so browsers can revalidate with If-None-Match"""
     try:
-        # Get chatbot from database
-        chatbot = await get_chatbot_by_id(chatbot_id)
-        if not chatbot:
+        document_id = await get_chatbot_document_id(chatbot_id)
+        if not document_id:
             raise HTTPException(status_code=404, detail="Chatbot not found")
-            
-        # Get all pages for this document
-        pages = await get_pages_by_document_id(chatbot.document.id_document)
-        if not pages:
-            raise HTTPException(status_code=404, detail="No pages found for document")
-            
-        # Look for the image in all pages
-        for page in pages:
-            if page.images:
-                for img in page.images:
-                    # Try both with and without file extension
-                    if img.id == image_id or img.id.split('.')[0] == image_id:
-                        return {"image_b64": img.image_b64}
-                        
-        raise HTTPException(status_code=404, detail=f"Image {image_id} not found")
         
+        # Cached image index first; documents ingested before it fall back to a projected page query
+        img = (await get_document_image_map(document_id)).get(image_id.split('.')[0])
+        if not img:
+            legacy_images = await get_page_images(document_id, [image_id])
+            img = legacy_images[0] if legacy_images else None
+        if not img:
+            raise HTTPException(status_code=404, detail=f"Image {image_id} not found")
+        
+        if_none_match = request.headers.get("if-none-match")
+        if img.hash:
+            etag = f'"{img.hash}"'
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+            data, mime = await aget_image_bytes(img.hash, img.mime), img.mime
+        else:
+            # Legacy inline base64 image
+            data, mime = await aread_image(img)
+            etag = f'"{hashlib.sha256(data).hexdigest()}"' if data is not None else None
+        
+        if data is None:
+            raise HTTPException(status_code=404, detail=f"Image {image_id} content is missing")
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return Response(
+            content=data,
+            media_type=mime,
+            headers={"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL}
+        )
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting image: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-async def extract_images_from_text(text: str, document_id: str) -> List[dict]:
+async def image_data_uri(img) -> Optional[str]:
+    """Data URI of an indexed or page image, reading blob bytes through the hot image cache"""
+    if not img.hash:
+        return await aimage_data_uri(img)
+    data = await aget_image_bytes(img.hash, img.mime)
+    return to_data_uri(data, img.mime) if data is not None else None
+
+IMAGE_PATTERN = re.compile(r'!\[(.*?)\]\((.*?)\)')
+
+def image_endpoint_url(chatbot_id: str, image_id: str) -> str:
+    return f"/v1/chat/image/{quote(chatbot_id, safe='')}/{quote(image_id, safe='')}"
+
+async def resolve_image_urls(references: List[str], document_id: str, chatbot_id: str) -> List[dict]:
+    """Map image references to cacheable URLs instead of inlining their bytes.
+
+    Blob-backed images use the public blob store URL when there is one,
+    everything else goes through the image endpoint.
+    """
+    image_map = await get_document_image_map(document_id)
+    missing = [ref for ref in references if ref.split('.')[0] not in image_map]
+    legacy_ids = set()
+    if missing:
+        legacy_ids = {img.id.split('.')[0] for img in await get_page_images(document_id, missing)}
+    
+    images = []
+    seen = set()
+    for image_ref in references:
+        image_id = image_ref.split('.')[0]
+        if image_id in seen:
+            continue
+        seen.add(image_id)
+        if image_id in image_map:
+            ref = image_map[image_id]
+            url = get_blob_store().url(ref.hash, ref.mime) or image_endpoint_url(chatbot_id, image_ref)
+            images.append({"id": image_ref, "url": url})
+        elif image_id in legacy_ids:
+            images.append({"id": image_ref, "url": image_endpoint_url(chatbot_id, image_ref)})
+        else:
+            logger.warning(f"Image {image_id} not found in document {document_id}")
+    return images
+
+class ImageReferenceTracker:
+    """Spot complete ![alt](ref) image references while an answer streams in"""
+    
+    def __init__(self):
+        self.text = ""
+        self.position = 0
+        self.seen = set()
+    
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text and return references completed by it that were not seen before"""
+        self.text += text
+        references = []
+        for match in IMAGE_PATTERN.finditer(self.text, self.position):
+            self.position = match.end()
+            image_ref = match.group(1)
+            if image_ref and image_ref.split('.')[0] not in self.seen:
+                self.seen.add(image_ref.split('.')[0])
+                references.append(image_ref)
+        return references
+
+async def stream_with_images(events, document_id: str, chat_request):
+    """Pass stream events through and, in url image mode, announce each new image
+    with an early {"type": "images"} event so the client can prefetch it."""
+    if chat_request.image_mode != "url":
+        async for event in events:
+            yield event
+        return
+    
+    tracker = ImageReferenceTracker()
+    async for event in events:
+        yield event
+        if event.type != "text":
+            continue
+        references = tracker.feed(event.text)
+        if references:
+            try:
+                images = await resolve_image_urls(references, document_id, chat_request.chatbot_id)
+            except Exception as e:
+                logger.error(f"Error resolving image URLs: {str(e)}")
+                continue
+            if images:
+                yield StreamEvent("images", images=images)
+
+async def extract_images_from_text(text: str, document_id: str, chatbot_id: str = None, image_mode: str = "inline") -> List[dict]:
     """Extract image information from text and fetch from database."""
     images = []
-    # Pattern to match markdown image syntax: ![img-2.jpeg](img-2.jpeg)
-    image_pattern = r'!\[(.*?)\]\((.*?)\)'
     
     try:
-        # Get all pages for this document
-        pages = await get_pages_by_document_id(document_id)
-        if not pages:
-            logger.warning(f"No pages found for document {document_id}")
+        # Find all image references in text, e.g. img-2.jpeg
+        references = [match.group(1) for match in IMAGE_PATTERN.finditer(text)]
+        if not references:
             return []
-            
-        # Create a map of page images for faster lookup
-        page_images_map = {}
-        for page in pages:
-            if page.images:
-                for img in page.images:
-                    # Remove file extension if present in the id
-                    clean_id = img.id.split('.')[0]
-                    page_images_map[clean_id] = img
-                    # Also store with extension for direct matches
-                    page_images_map[img.id] = img
         
-        # Find all image matches in text
-        matches = re.finditer(image_pattern, text)
+        if image_mode == "url" and chatbot_id:
+            return await resolve_image_urls(references, document_id, chatbot_id)
         
-        # Process each image match
-        for match in matches:
-            image_ref = match.group(1)  # e.g. img-2.jpeg
-            image_name = match.group(2)  # e.g. img-2.jpeg
-            
-            # Try different variations of the image id
+        # Cached image index of the document; only referenced images are read
+        image_map = await get_document_image_map(document_id)
+        
+        # Documents ingested before the image index: fetch just the missing images
+        missing = [ref for ref in references if ref.split('.')[0] not in image_map]
+        legacy_images = {}
+        if missing:
+            for img in await get_page_images(document_id, missing):
+                legacy_images.setdefault(img.id.split('.')[0], img)
+        
+        # Process each image reference
+        for image_ref in references:
             image_id = image_ref.split('.')[0]  # e.g. img-2
             
-            # Look up image in our map
-            if image_id in page_images_map:
-                img = page_images_map[image_id]
-                images.append({
-                    "id": img.id,
-                    "image_b64": img.image_b64
-                })
+            if image_id in image_map:
+                ref = image_map[image_id]
+                images.append({"id": ref.image_id, "image_b64": await image_data_uri(ref)})
+                logger.info(f"Found image {image_id} in document {document_id}")
+            elif image_id in legacy_images:
+                img = legacy_images[image_id]
+                images.append({"id": img.id, "image_b64": await image_data_uri(img)})
                 logger.info(f"Found image {image_id} in document {document_id}")
             else:
                 logger.warning(f"Image {image_id} not found in document {document_id}")
@@ -8,9 +8,9 @@ import os
 # Add the project root directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.chatbot import create_chatbot, get_chatbot_by_id
+from database.chatbot import create_chatbot, get_chatbot_document_id
 from database.document import get_document_by_id
-from database.page import get_pages_by_document_id
+from database.page import count_pages
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -33,9 +33,8 @@ async def create_chatbot_from_document(request: CreateChatbotRequest):
         if not document:
             raise HTTPException(status_code=404, detail="Document not found")
             
-        # Get all pages of the document
-        pages = await get_pages_by_document_id(request.document_id)
-        if not pages:
+        # Check that the document has pages without loading them
+        if not await count_pages(request.document_id, limit=1):
             raise HTTPException(status_code=404, detail="No pages found for this document")
             
         # Generate unique chatbot ID
@@ -63,12 +62,12 @@ async def create_chatbot_from_document(request: CreateChatbotRequest):
 @router.get("/{chatbot_id}/document-url")
 async def get_document_url(chatbot_id: str):
     # Get chatbot
-    chatbot = await get_chatbot_by_id(chatbot_id)
-    if not chatbot:
+    document_id = await get_chatbot_document_id(chatbot_id)
+    if not document_id:
         raise HTTPException(status_code=404, detail="Chatbot not found")
     
     # Get document
-    document = await get_document_by_id(chatbot.document.id_document)
+    document = await get_document_by_id(document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
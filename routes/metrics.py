@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+import sys
+import os
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.index_cache import index_cache
+from core.embedding_cache import query_embedding_cache
+from core.rerank import rerank_stats
+from core.image_cache import image_cache
+from core.streaming import stream_stats
+from LLM.clients import connection_stats
+from core.answer_cache import answer_cache
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics():
+    """Expose in-process cache counters for monitoring"""
+    return {
+        "vector_index_cache": index_cache.stats(),
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "rerank": rerank_stats.stats(),
+        "image_cache": image_cache.stats(),
+        "sse": stream_stats.stats(),
+        "llm_connections": connection_stats.stats(),
+        "answer_cache": answer_cache.stats()
+    }
@@ -3,9 +3,9 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import os
 import sys
-import subprocess
-from typing import List
+from typing import List, Optional
 import shutil
+import asyncio
 from datetime import datetime
 import uuid
 from mistralai import Mistral
@@ -19,14 +19,20 @@ logger = logging.getLogger(__name__)
 # Add the project root directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from collection_db.page import Image
-from database.page import create_page, get_page_by_id, get_all_pages, update_page, delete_page
+from collection_db.page import Image, Page
+from database.page import create_pages, get_page_by_id, get_all_pages, update_page, delete_page, delete_pages_by_document_id
 from database.document import create_document, get_document_by_id, get_all_documents, update_document, delete_document
+from database.job import create_job, get_job_by_id, update_job_stage
+from database.image import image_refs_for_pages, create_image_refs
+from collection_db.job import IngestJob, JobStage
+from core.jobs import IngestWorker
 
-# Import chunk processing
-from routes.chunk import process_json_file
+# Import ingestion pipeline
+from core.pipeline import arun_ingestion
+from core.answer_cache import answer_cache
 
 from commons.cloudflare_upload import simple_upload_to_cloudflare
+from commons.blob_store import get_blob_store, decode_image_payload
 
 router = APIRouter()
 
@@ -35,6 +41,22 @@ class PDFUploadRequest(BaseModel):
 
 class PDFUploadResponse(BaseModel):
     document_id: str
+    job_id: str
+    status: str
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    document_id: str
+    status: str
+    stages: List[JobStage]
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+# Stages reported on GET /jobs/{job_id}, in execution order
+INGEST_STAGES = ["ocr", "pages", "save", "ingest"]
 
 def save_processed_response(document_id: str, pdf_url: str, pages: List[dict], timestamp: str = None):
     """Save processed response to JSON file."""
@@ -50,7 +72,7 @@ def save_processed_response(document_id: str, pdf_url: str, pages: List[dict], t
         # Create filenames with document_id
         json_filename = f"processed_response_{document_id}_{timestamp}.json"
         documents_filename = f"documents_{document_id}.json"
-        vector_filename = f"vector_{document_id}.pkl"
+        vector_filename = f"vector_{document_id}.vec"
         
         json_filepath = os.path.join(data_dir, json_filename)
         documents_filepath = os.path.join(data_dir, documents_filename)
@@ -77,48 +99,138 @@ def save_processed_response(document_id: str, pdf_url: str, pages: List[dict], t
         logger.error(f"Error saving processed response to JSON: {str(e)}", exc_info=True)
         raise
 
-def process_chunks_and_embeddings(json_filepath: str, documents_filepath: str, vector_filepath: str):
-    """Process chunks and create embeddings after saving JSON file."""
-    try:
-        # Step 1: Process chunks using chunk.py
-        logger.info("Processing chunks from JSON file")
-        process_json_file(json_filepath, documents_filepath)
-        logger.info(f"Successfully created chunks in {documents_filepath}")
+def run_ocr(pdf_url: str):
+    """Run Mistral OCR on a PDF URL (blocking, call from a worker thread)."""
+    load_dotenv()
+    client = Mistral(api_key=os.environ["MISTRAL_API_KEY"])
+    return client.ocr.process(
+        model="mistral-ocr-latest",
+        document={
+            "type": "document_url",
+            "document_url": pdf_url
+        },
+        include_image_base64=True
+    )
+
+def store_image(image_id: str, image_base64: str) -> Image:
+    """Put an OCR image into the blob store and return the reference kept on the page."""
+    data, mime = decode_image_payload(image_base64, image_id)
+    blob = get_blob_store().put(data, mime)
+    return Image(id=image_id, hash=blob.hash, size=blob.size, mime=blob.mime)
 
-        # Step 2: Create embeddings using embed_chunk.py
-        logger.info("Creating embeddings from chunks")
-        embed_script_path = "/Users/uyenvuong/panasonic/scripts/embed_chunk.py"
-        result = subprocess.run(['python', embed_script_path, documents_filepath, vector_filepath], capture_output=True, text=True)
+def build_pages(document_id: str, ocr_response):
+    """Build Page documents and processed page data from an OCR response (blocking, writes blobs)."""
+    pages = []
+    processed_pages = []
+    logger.info(f"Processing {len(ocr_response.pages)} pages")
+    for page in ocr_response.pages:
+        # Store OCR images once in the blob store; pages keep only references
+        images = [store_image(img.id, img.image_base64) for img in page.images]
         
-        if result.returncode == 0:
-            logger.info("Successfully created embeddings")
-        else:
-            logger.error(f"Error creating embeddings: {result.stderr}")
-            raise Exception("Failed to create embeddings")
+        page_id = f"{document_id}_page_{page.index}"
+        pages.append(Page(
+            document_id=document_id,
+            page_id=page_id,
+            page_number=page.index + 1,
+            markdown=page.markdown,
+            images=images
+        ))
+            
+        # Add processed page data
+        processed_pages.append({
+            "page_id": page_id,
+            "page_number": page.index + 1,
+            "markdown": page.markdown,
+            "images": [
+                {
+                    "id": img.id,
+                    "hash": img.hash,
+                    "size": img.size,
+                    "mime": img.mime
+                }
+                for img in images
+            ]
+        })
+    return pages, processed_pages
 
+async def process_pdf_job(job: IngestJob):
+    """Run OCR, page persistence and chunk/embedding ingestion for one queued upload."""
+    document_id = job.document_id
+    running_stage = None
+    
+    async def start_stage(stage):
+        nonlocal running_stage
+        running_stage = stage
+        await update_job_stage(job.job_id, stage, "running")
+    
+    async def finish_stage(stage, detail=None):
+        nonlocal running_stage
+        running_stage = None
+        await update_job_stage(job.job_id, stage, "done", detail=detail)
+    
+    try:
+        # Process PDF with OCR off the event loop
+        await start_stage("ocr")
+        logger.info(f"Processing PDF with Mistral OCR for document {document_id}")
+        ocr_response = await asyncio.to_thread(run_ocr, job.pdf_url)
+        await finish_stage("ocr", detail=f"{len(ocr_response.pages)} pages")
+        
+        # Process and save each page; clear pages left over from an interrupted attempt first
+        await start_stage("pages")
+        await delete_pages_by_document_id(document_id)
+        # Answers of the previous version must not be replayed while the document is rebuilt
+        answer_cache.invalidate(document_id)
+        pages, processed_pages = await asyncio.to_thread(build_pages, document_id, ocr_response)
+        
+        # Insert pages in bulk
+        inserted, failed_page_ids = await create_pages(pages)
+        if failed_page_ids:
+            raise Exception(f"Failed to create {len(failed_page_ids)} pages: {', '.join(failed_page_ids[:5])}")
+        
+        # Index images so the image endpoint can find them without scanning pages
+        indexed_images = await create_image_refs(image_refs_for_pages(pages))
+        await finish_stage("pages", detail=f"{inserted} pages, {indexed_images} images")
+        
+        # Save processed response to JSON
+        await start_stage("save")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        json_filepath, documents_filepath, vector_filepath = await asyncio.to_thread(
+            save_processed_response,
+            document_id=document_id,
+            pdf_url=job.pdf_url,
+            pages=processed_pages,
+            timestamp=timestamp
+        )
+        await finish_stage("save")
+        
+        # Process chunks and create embeddings with unique file paths
+        await start_stage("ingest")
+        timings = await arun_ingestion(processed_pages, documents_filepath, vector_filepath)
+        
+        # Store the file paths in the document record
+        await update_document(document_id, {
+            "documents_path": documents_filepath,
+            "vector_path": vector_filepath
+        })
+        # Drop answers generated against the old index during the rebuild
+        answer_cache.invalidate(document_id)
+        await finish_stage(
+            "ingest",
+            detail=", ".join(f"{stage}={seconds:.1f}s" for stage, seconds in timings.items())
+        )
     except Exception as e:
-        logger.error(f"Error in chunk processing and embedding: {str(e)}", exc_info=True)
+        # Resolve the stage that was running so status polling sees where the job failed
+        if running_stage is not None:
+            await update_job_stage(job.job_id, running_stage, "failed", detail=str(e))
         raise
+    logger.info(f"Successfully processed PDF. Document ID: {document_id}")
+
+ingest_worker = IngestWorker(handler=process_pdf_job)
 
 @router.post("/upload", response_model=PDFUploadResponse)
 async def upload_pdf(request: PDFUploadRequest):
     try:
-        logger.info(f"Starting PDF upload process for URL: {request.pdf_url}")
-        
-        # Initialize Mistral client
-        load_dotenv()
-        client = Mistral(api_key=os.environ["MISTRAL_API_KEY"])
-        
-        # Process PDF with OCR
-        logger.info("Processing PDF with Mistral OCR")
-        ocr_response = client.ocr.process(
-            model="mistral-ocr-latest",
-            document={
-                "type": "document_url",
-                "document_url": request.pdf_url
-            },
-            include_image_base64=True
-        )
+        logger.info(f"Enqueuing PDF upload for URL: {request.pdf_url}")
         
         # Generate unique document ID
         document_id = str(uuid.uuid4())
@@ -133,79 +245,49 @@ async def upload_pdf(request: PDFUploadRequest):
         
         if not document:
             raise HTTPException(status_code=500, detail="Failed to create document in database")
-            
-        # Process and save each page
-        processed_pages = []
-        logger.info(f"Processing {len(ocr_response.pages)} pages")
-        for page in ocr_response.pages:
-            # Convert OCR images to our Image model
-            images = [
-                Image(
-                    id=img.id,
-                    image_b64=img.image_base64
-                )
-                for img in page.images
-            ]
-            
-            # Create page in database
-            page_id = f"{document_id}_page_{page.index}"
-            logger.info(f"Creating page {page_id}")
-            created_page = await create_page(
-                document_id=document_id,
-                page_id=page_id,
-                page_number=page.index + 1,
-                markdown=page.markdown,
-                images=images
-            )
-            
-            if not created_page:
-                logger.error(f"Failed to create page {page_id}")
-                raise HTTPException(status_code=500, detail=f"Failed to create page {page_id}")
-                
-            # Add processed page data
-            processed_pages.append({
-                "page_id": page_id,
-                "page_number": page.index + 1,
-                "markdown": page.markdown,
-                "images": [
-                    {
-                        "id": img.id,
-                        "image_b64": img.image_b64
-                    }
-                    for img in images
-                ]
-            })
         
-        # Save processed response to JSON
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Enqueue OCR and ingestion; progress is reported on GET /jobs/{job_id}
         try:
-            json_filepath, documents_filepath, vector_filepath = save_processed_response(
+            job = await create_job(
+                job_id=str(uuid.uuid4()),
                 document_id=document_id,
                 pdf_url=request.pdf_url,
-                pages=processed_pages,
-                timestamp=timestamp
+                stages=INGEST_STAGES
             )
-            
-            # Process chunks and create embeddings with unique file paths
-            process_chunks_and_embeddings(json_filepath, documents_filepath, vector_filepath)
-            
-            # Store the file paths in the document record
-            await update_document(document_id, {
-                "documents_path": documents_filepath,
-                "vector_path": vector_filepath
-            })
-            
-        except Exception as e:
-            logger.error(f"Failed to process chunks and embeddings: {str(e)}", exc_info=True)
-            # Continue even if processing fails
+        except Exception:
+            job = None
+            logger.error(f"Error enqueuing ingest job for document {document_id}", exc_info=True)
+        if not job:
+            # Without a job the document would never get pages; do not leave it behind
+            await delete_document(document_id)
+            raise HTTPException(status_code=500, detail="Failed to enqueue ingest job")
+        ingest_worker.notify()
         
-        logger.info(f"Successfully processed PDF. Document ID: {document_id}")
-        return PDFUploadResponse(document_id=document_id)
+        return PDFUploadResponse(document_id=document_id, job_id=job.job_id, status=job.status)
         
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.error(f"Error processing PDF: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(job_id: str):
+    job = await get_job_by_id(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatusResponse(
+        job_id=job.job_id,
+        document_id=job.document_id,
+        status=job.status,
+        stages=job.stages,
+        error=job.error,
+        attempts=job.attempts,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
+
 @router.post("/upload-file")
 async def upload_file(file: UploadFile = File(...)):
     try:
@@ -0,0 +1,180 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+
+from dotenv import load_dotenv
+from pymongo import monitoring
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+# Sizable pages, so reads that carry the markdown show up in the numbers
+PAGE_MARKDOWN_CHARS = 20000
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts the commands sent to the server, i.e. round-trips"""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+async def connect(mongomock=False):
+    """Initialize Beanie on a throwaway database of DATABASE_URL, or on mongomock-motor"""
+    from beanie import init_beanie
+    from collection_db.document import DocumentModel
+    from collection_db.page import Page
+    from collection_db.image import ImageRef
+    from collection_db.chatbot import Chatbot
+    from collection_db.chat_turn import ChatTurn
+
+    counter = None
+    if mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        counter = CommandCounter()
+        client = AsyncIOMotorClient(os.getenv("DATABASE_URL"), event_listeners=[counter])
+    database = client[f"{os.getenv('DATABASE_NAME', 'chatbot')}_benchmark_{uuid.uuid4().hex[:8]}"]
+    await init_beanie(database=database, document_models=[DocumentModel, Page, ImageRef, Chatbot, ChatTurn])
+    return client, database, counter
+
+
+async def seed(count):
+    from collection_db.document import DocumentModel
+    from collection_db.page import Page, Image
+    from collection_db.chatbot import Chatbot, DocumentRef
+
+    document_id = "benchmark-document"
+    await DocumentModel(document_id=document_id, link_document="https://example.com/manual.pdf").insert()
+    await Page.insert_many([
+        Page(
+            document_id=document_id,
+            page_id=f"page-{i}",
+            page_number=i,
+            markdown="x" * PAGE_MARKDOWN_CHARS,
+            images=[Image(id=f"img-{i}.jpeg", hash=uuid.uuid4().hex, size=1024, mime="image/jpeg")]
+        )
+        for i in range(count)
+    ])
+    await Chatbot.insert_many([
+        Chatbot(chatbot_id=f"chatbot-{i}", document=DocumentRef(id_document=document_id))
+        for i in range(count)
+    ])
+    return document_id
+
+
+# Helpers as written before they were reduced to a single round-trip: read the
+# whole document through Beanie, then write it back
+async def legacy_update_document(document_id, update_data):
+    from collection_db.document import DocumentModel
+    update_data["updated_at"] = datetime.utcnow()
+    document = await DocumentModel.find_one({"document_id": document_id})
+    if not document:
+        return None
+    await document.update({"$set": update_data})
+    return document
+
+
+async def legacy_update_page(page_id, markdown):
+    from collection_db.page import Page
+    page = await Page.find_one({"page_id": page_id})
+    if not page:
+        return None
+    await page.update({"$set": {"markdown": markdown, "updated_at": datetime.utcnow()}})
+    return page
+
+
+async def legacy_add_image_to_page(page_id, image):
+    from collection_db.page import Page
+    page = await Page.find_one({"page_id": page_id})
+    if not page:
+        return None
+    await page.update({"$push": {"images": image.model_dump()}, "$set": {"updated_at": datetime.utcnow()}})
+    return await Page.find_one({"page_id": page_id})
+
+
+async def legacy_clear_chat_history(chatbot_id):
+    from collection_db.chatbot import Chatbot
+    from collection_db.chat_turn import ChatTurn
+    chatbot = await Chatbot.find_one({"chatbot_id": chatbot_id})
+    if not chatbot:
+        return None
+    await chatbot.update({"$set": {"history": [], "updated_at": datetime.utcnow()}})
+    await ChatTurn.find({"chatbot_id": chatbot_id}).delete()
+    return chatbot
+
+
+async def measure(name, call, count, counter):
+    timings = []
+    commands = counter.count if counter else 0
+    for i in range(count):
+        started = time.perf_counter()
+        await call(i)
+        timings.append((time.perf_counter() - started) * 1000)
+    round_trips = f"{(counter.count - commands) / count:5.1f}" if counter else "  n/a"
+    print(
+        f"{name:<28} mean {statistics.mean(timings):7.2f} ms  "
+        f"p50 {statistics.median(timings):7.2f} ms  "
+        f"max {max(timings):7.2f} ms  round-trips/call {round_trips}"
+    )
+
+
+async def run(count, mongomock=False):
+    from collection_db.page import Image
+    from database.document import update_document
+    from database.page import update_page, add_image_to_page
+    from database.chatbot import clear_chat_history
+
+    client, database, counter = await connect(mongomock)
+    try:
+        document_id = await seed(count)
+        markdown = "y" * PAGE_MARKDOWN_CHARS
+
+        def image(i, prefix):
+            return Image(id=f"{prefix}-{i}.png", hash=uuid.uuid4().hex, size=2048, mime="image/png")
+
+        benchmarks = [
+            ("update_document", lambda i: legacy_update_document(document_id, {"vector_path": f"v{i}"}),
+             lambda i: update_document(document_id, {"vector_path": f"v{i}"})),
+            ("update_page", lambda i: legacy_update_page(f"page-{i}", markdown),
+             lambda i: update_page(f"page-{i}", markdown=markdown)),
+            ("add_image_to_page", lambda i: legacy_add_image_to_page(f"page-{i}", image(i, "legacy")),
+             lambda i: add_image_to_page(f"page-{i}", image(i, "new"))),
+            ("clear_chat_history", lambda i: legacy_clear_chat_history(f"chatbot-{i}"),
+             lambda i: clear_chat_history(f"chatbot-{i}"))
+        ]
+        for name, legacy, current in benchmarks:
+            await measure(f"{name} (before)", legacy, count, counter)
+            await measure(f"{name} (after)", current, count, counter)
+    finally:
+        await client.drop_database(database.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare database helper latency before and after the single round-trip rewrite")
+    parser.add_argument("--count", type=int, default=200, help="Calls per helper")
+    parser.add_argument("--mongomock", action="store_true", help="Run against mongomock-motor instead of DATABASE_URL")
+    args = parser.parse_args()
+    asyncio.run(run(args.count, mongomock=args.mongomock))
+
+
+if __name__ == "__main__":
+    main()
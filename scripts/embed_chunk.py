@@ -1,15 +1,22 @@
 import json
-import cohere
 import os
 from dotenv import load_dotenv
 import numpy as np
 import pickle
 import sys
+import logging
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.vector_store import write_vector_store, open_vector_store, is_vector_store
+from core.lexical_index import LexicalIndex, lexical_index_path
+from core.embedding import batch_embed
 
 load_dotenv()
 
-API_KEY = os.getenv("COHERE_API_KEY")
-co = cohere.ClientV2(api_key=API_KEY)
+# Configure logging
+logger = logging.getLogger(__name__)
 
 def load_documents(documents_path):
     with open(documents_path, 'r', encoding='utf-8') as f:
@@ -22,36 +29,25 @@ def load_documents(documents_path):
         
     return chunks
 
-def batch_embed(texts, batch_size=96):
-    all_embeddings = []
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i+batch_size]
-        response = co.embed(
-            texts=batch,
-            model="embed-multilingual-v3.0",
-            input_type="search_document",
-            embedding_types=['float']
-        )
-        all_embeddings.extend(response.embeddings.float)
-    return all_embeddings
-
-def save_vector_database(vector_database, filepath):
-    """Save vector database to file"""
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    with open(filepath, 'wb') as f:
-        pickle.dump(vector_database, f)
-    print(f"Vector database saved to {filepath}")
+def save_vector_database(embeddings, chunks, filepath, dtype="float32"):
+    """Save vector database to file in the binary vector store format"""
+    write_vector_store(filepath, embeddings, chunks, dtype=dtype)
 
 def load_vector_database(filepath):
     """Load vector database from file"""
     if not os.path.exists(filepath):
         return None
-    with open(filepath, 'rb') as f:
-        vector_database = pickle.load(f)
+    if is_vector_store(filepath):
+        vector_database = open_vector_store(filepath).matrix
+    else:
+        with open(filepath, 'rb') as f:
+            vector_database = pickle.load(f)
     print(f"Vector database loaded from {filepath}")
     return vector_database
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
     if len(sys.argv) != 3:
         print("Usage: python embed_chunk.py <documents_path> <vector_output_path>")
         sys.exit(1)
@@ -66,11 +62,11 @@ if __name__ == "__main__":
     embeddings = batch_embed(chunks) 
     print(f"Calculated {len(embeddings)} embeddings")
 
-    # Create vector database
-    vector_database = {i: np.array(embedding) for i, embedding in enumerate(embeddings)}
-    
     # Save vector database
-    save_vector_database(vector_database, vector_output_path)
+    save_vector_database(np.array(embeddings), chunks, vector_output_path)
+
+    # Build the lexical index alongside the vector file
+    LexicalIndex.build(chunks).save(lexical_index_path(vector_output_path))
 
     # Test loading
     loaded_db = load_vector_database(vector_output_path)
@@ -0,0 +1,69 @@
+import argparse
+import asyncio
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+
+async def migrate(chatbot_id=None, dry_run=False):
+    """Move embedded Chatbot.history items into the chat_turn collection"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from beanie import init_beanie
+    from collection_db.chatbot import Chatbot
+    from collection_db.chat_turn import ChatTurn
+
+    client = AsyncIOMotorClient(os.getenv("DATABASE_URL"))
+    await init_beanie(database=client[os.getenv("DATABASE_NAME")], document_models=[Chatbot, ChatTurn])
+
+    query = {"history.0": {"$exists": True}}
+    if chatbot_id:
+        query["chatbot_id"] = chatbot_id
+
+    migrated_chatbots = 0
+    migrated_turns = 0
+    async for chatbot in Chatbot.find(query):
+        # Turns copied by an interrupted earlier run are not inserted twice
+        existing = {
+            turn.timestamp
+            for turn in await ChatTurn.find({"chatbot_id": chatbot.chatbot_id}).to_list()
+        }
+        turns = [
+            ChatTurn(
+                chatbot_id=chatbot.chatbot_id,
+                question=item.question,
+                answer=item.answer,
+                timestamp=item.timestamp
+            )
+            for item in chatbot.history
+            if item.timestamp not in existing
+        ]
+        migrated_chatbots += 1
+        migrated_turns += len(turns)
+        if dry_run:
+            continue
+        if turns:
+            await ChatTurn.insert_many(turns)
+        await Chatbot.get_motor_collection().update_one(
+            {"_id": chatbot.id},
+            {"$set": {"history": []}}
+        )
+    action = "Would migrate" if dry_run else "Migrated"
+    print(f"{action} {migrated_turns} turns of {migrated_chatbots} chatbots")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move embedded chatbot histories into the chat_turn collection")
+    parser.add_argument("--chatbot-id", help="Only migrate this chatbot")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(migrate(chatbot_id=args.chatbot_id, dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
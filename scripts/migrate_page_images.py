@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from commons.blob_store import get_blob_store, decode_image_payload
+
+load_dotenv()
+
+
+async def migrate(document_id=None, dry_run=False):
+    """Move inline image_b64 payloads of pages into the blob store"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from beanie import init_beanie
+    from collection_db.page import Page, Image
+    from collection_db.image import ImageRef
+
+    client = AsyncIOMotorClient(os.getenv("DATABASE_URL"))
+    await init_beanie(database=client[os.getenv("DATABASE_NAME")], document_models=[Page, ImageRef])
+
+    query = {"images": {"$elemMatch": {"image_b64": {"$type": "string"}}}}
+    if document_id:
+        query["document_id"] = document_id
+
+    store = get_blob_store()
+    migrated_pages = 0
+    saved_bytes = 0
+    async for page in Page.find(query):
+        images = []
+        for img in page.images:
+            if not img.image_b64:
+                images.append(img)
+                continue
+            data, mime = decode_image_payload(img.image_b64, img.id)
+            saved_bytes += len(img.image_b64)
+            if dry_run:
+                images.append(img)
+                continue
+            blob = await asyncio.to_thread(store.put, data, mime)
+            images.append(Image(id=img.id, hash=blob.hash, size=blob.size, mime=blob.mime))
+        if not dry_run:
+            await Page.get_motor_collection().update_one(
+                {"_id": page.id},
+                {"$set": {"images": [img.model_dump(exclude_none=True) for img in images]}}
+            )
+        migrated_pages += 1
+    action = "Would migrate" if dry_run else "Migrated"
+    print(f"{action} {migrated_pages} pages, removing {saved_bytes / 1024 / 1024:.1f} MB of inline base64")
+
+    if not dry_run:
+        await index_images(Page, document_id)
+
+
+async def index_images(page_model, document_id=None):
+    """(Re)build image index entries for pages whose images live in the blob store"""
+    from collection_db.image import ImageRef
+    from database.image import image_refs_for_pages, create_image_refs
+
+    query = {"images.hash": {"$type": "string"}}
+    if document_id:
+        query["document_id"] = document_id
+
+    indexed = 0
+    async for page in page_model.find(query):
+        await ImageRef.find({"page_id": page.page_id}).delete()
+        indexed += await create_image_refs(image_refs_for_pages([page]))
+    print(f"Indexed {indexed} images")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move inline page images into the content-addressed blob store")
+    parser.add_argument("--document-id", help="Only migrate pages of this document")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(migrate(document_id=args.document_id, dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+import pickle
+import sys
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.vector_store import write_vector_store, VECTOR_STORE_EXTENSION, DTYPE_CODES
+from core.lexical_index import LexicalIndex, lexical_index_path
+
+load_dotenv()
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def load_chunks(documents_path):
+    """Load chunk texts exactly as core.retrieve.load_documents builds them"""
+    with open(documents_path, 'r', encoding='utf-8') as f:
+        documents = json.load(f)
+    return [f"{doc['title']} {doc['snippet']}" for doc in documents]
+
+
+def find_pairs(data_dir):
+    """Yield (documents_path, pickle_path) pairs found in data_dir"""
+    for pkl_path in sorted(glob.glob(os.path.join(data_dir, 'vector*.pkl'))):
+        suffix = os.path.basename(pkl_path)[len('vector'):-len('.pkl')]
+        documents_path = os.path.join(data_dir, f"documents{suffix}.json")
+        if os.path.exists(documents_path):
+            yield documents_path, pkl_path
+        else:
+            print(f"Skipping {pkl_path}: no matching {os.path.basename(documents_path)}")
+
+
+def convert(documents_path, pkl_path, dtype="float32", overwrite=False):
+    """Convert one pickle/documents pair and return the new vector store path"""
+    vec_path = os.path.splitext(pkl_path)[0] + VECTOR_STORE_EXTENSION
+    if os.path.exists(vec_path) and not overwrite:
+        print(f"Skipping {pkl_path}: {vec_path} already exists")
+        return vec_path
+    chunks = load_chunks(documents_path)
+    with open(pkl_path, 'rb') as f:
+        vector_data = pickle.load(f)
+    embeddings = np.stack([np.asarray(vector_data[i], dtype=np.float32) for i in range(len(chunks))])
+    write_vector_store(vec_path, embeddings, chunks, dtype=dtype)
+    LexicalIndex.build(chunks).save(lexical_index_path(vec_path))
+    return vec_path
+
+
+async def update_document_paths(converted):
+    """Point DocumentModel.vector_path at the converted files"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from beanie import init_beanie
+    from collection_db.document import DocumentModel
+    from database.document import update_document
+
+    client = AsyncIOMotorClient(os.getenv("DATABASE_URL"))
+    await init_beanie(database=client[os.getenv("DATABASE_NAME")], document_models=[DocumentModel])
+    for pkl_path, vec_path in converted.items():
+        documents = await DocumentModel.find({"vector_path": pkl_path}).to_list()
+        for document in documents:
+            await update_document(document.document_id, {"vector_path": vec_path})
+            print(f"Updated document {document.document_id}: {vec_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert vector_<id>.pkl files to the binary vector store format")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--dtype", default="float32", choices=sorted(DTYPE_CODES))
+    parser.add_argument("--overwrite", action="store_true", help="Rewrite existing .vec files")
+    parser.add_argument("--update-db", action="store_true", help="Update vector_path of matching documents in MongoDB")
+    args = parser.parse_args()
+
+    converted = {}
+    for documents_path, pkl_path in find_pairs(args.data_dir):
+        try:
+            converted[pkl_path] = convert(documents_path, pkl_path, dtype=args.dtype, overwrite=args.overwrite)
+        except Exception as e:
+            print(f"Failed to convert {pkl_path}: {str(e)}")
+    print(f"Converted {len(converted)} vector files")
+
+    if args.update_db and converted:
+        asyncio.run(update_document_paths(converted))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core.retrieve as retrieve
+from core.rerank import LocalReranker, arerank_results, rerank_stats
+from core.vector_store import write_vector_store
+
+CHUNKS = [
+    "Charge the battery fully before first use",
+    "Connect the printer to the wireless network",
+    "Replace the battery cover after charging the battery",
+    "Clean the lens with a dry cloth"
+]
+
+
+class SlowReranker(LocalReranker):
+    """Reranker that answers only after the given delay"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    async def arerank(self, query, documents, top_n):
+        await asyncio.sleep(self.delay)
+        return self.rerank(query, documents, top_n)
+
+
+def fake_embed(queries):
+    """Deterministic embeddings: every query points at the first chunk's vector"""
+    return np.tile(np.eye(len(CHUNKS), dtype=np.float32)[0], (len(queries), 1))
+
+
+@pytest.fixture
+def index_paths(tmp_path):
+    vector_path = str(tmp_path / "vectors.vec")
+    write_vector_store(vector_path, np.eye(len(CHUNKS), dtype=np.float32), CHUNKS)
+    return str(tmp_path / "documents.json"), vector_path
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(retrieve, "embed_queries", fake_embed)
+
+    async def aembed(queries):
+        return fake_embed(queries)
+
+    monkeypatch.setattr(retrieve, "aembed_queries", aembed)
+    retrieve.index_cache.clear()
+
+
+def test_retrieve_and_rerank_with_local_reranker(index_paths):
+    documents_path, vector_path = index_paths
+    results = retrieve.retrieve_and_rerank(
+        "battery charging", documents_path, vector_path,
+        k=4, rerank_k=2, document_id="local-rerank", reranker=LocalReranker()
+    )
+    assert len(results) == 2
+    # Both battery chunks share the most bigrams with the query
+    assert {chunk for chunk, _ in results} == {CHUNKS[0], CHUNKS[2]}
+    assert results[0][1] >= results[1][1]
+
+
+def test_rerank_past_budget_keeps_recall_order():
+    candidates = [(chunk, 1.0 - i / 10) for i, chunk in enumerate(CHUNKS)]
+    timeouts = rerank_stats.timeouts
+    results = asyncio.run(arerank_results("lens", candidates, 2, reranker=SlowReranker(1.0), timeout=0.05))
+    assert results == candidates[:2]
+    assert rerank_stats.timeouts == timeouts + 1
+
+
+def test_recall_timeout_falls_back_to_lexical(index_paths, monkeypatch):
+    documents_path, vector_path = index_paths
+    # Warm the index, then make recall miss its budget
+    retrieve.get_index(documents_path, vector_path, "lexical-fallback")
+
+    async def slow_embed(queries):
+        await asyncio.sleep(1.0)
+        return fake_embed(queries)
+
+    monkeypatch.setattr(retrieve, "aembed_queries", slow_embed)
+    monkeypatch.setattr(retrieve, "RECALL_TIMEOUT", 0.05)
+    results = asyncio.run(retrieve.aretrieve(
+        "wireless network", documents_path, vector_path,
+        k=4, rerank_k=1, document_id="lexical-fallback", reranker=LocalReranker()
+    ))
+    assert [chunk for chunk, _ in results] == [CHUNKS[1]]
+
+
+def test_recall_timeout_without_lexical_index_returns_nothing(index_paths, monkeypatch):
+    documents_path, vector_path = index_paths
+
+    async def slow_embed(queries):
+        await asyncio.sleep(1.0)
+        return fake_embed(queries)
+
+    monkeypatch.setattr(retrieve, "RETRIEVAL_MODE", "vector")
+    monkeypatch.setattr(retrieve, "aembed_queries", slow_embed)
+    monkeypatch.setattr(retrieve, "RECALL_TIMEOUT", 0.05)
+    results = asyncio.run(retrieve.aretrieve(
+        "wireless network", documents_path, vector_path,
+        k=4, rerank_k=1, document_id="vector-only", reranker=LocalReranker()
+    ))
+    assert results == []